@@ -0,0 +1,1086 @@
+import os
+import json
+import time
+import asyncio
+import inspect
+import functools
+from pathlib import Path
+from datetime import datetime
+from typing import List, Dict, Optional, Callable
+
+import httpx
+from playwright.async_api import async_playwright
+
+from base import BaseSnowCat, PollResult
+from scheduler import AdaptiveScheduler
+from ratelimit import RateLimiter
+from notifier import Notifier
+from errors import NetworkError, DeadlineError, CircuitOpenError
+from breaker import CircuitBreaker
+from tokencache import TokenCache
+from fileutil import write_private
+from retry import RetryPolicy
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, rate_limiter: RateLimiter) -> None:
+        """
+        An async transport waiting for a token from the rate limiter before every request it sends
+
+        :param transport:       the transport actually sending the requests
+        :param rate_limiter:    the rate limiter shared by the requests
+        """
+
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.rate_limiter.take_prepaid():
+            await self.rate_limiter.acquire_async(str(request.url))
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class AsyncSnowCat(BaseSnowCat):
+    def __init__(
+        self,
+        level: str = 'INFO',
+        config_path: os.PathLike | str = Path.cwd() / Path("../configs/.env.user_config"),
+        pool_size: int = 100,
+        max_retries: int = 3,
+        keep_context: bool = True,
+        storage_state_path: Optional[os.PathLike | str] = Path.cwd() / Path("../configs/.storage_state.json"),
+        proactive_refresh: bool = True,
+        refresh_margin: float = 0.8,
+        refresh_mode: str = 'http',
+        block_resources: Optional[tuple[str, ...]] = ("image", "font", "media"),
+        viewport: Optional[Dict] = None,
+        page_size: int = 500,
+        json_backend: str = 'auto',
+        fields: Optional[tuple[str, ...]] = None,
+        records: bool = False,
+        rate_limiter: Optional[RateLimiter] = None,
+        notifier: Optional[Notifier | str] = 'auto',
+        notify_window: float = 1.0,
+        breaker: Optional[CircuitBreaker] = None,
+        connect_timeout: float = 5,
+        read_timeout: float = 15,
+        fetch_deadline: Optional[float] = 30,
+        refresh_deadline: Optional[float] = 300,
+        hedge_percentile: Optional[float] = None,
+        hedge_max_rate: float = 0.1,
+        token_cache: Optional[TokenCache] = None
+    ) -> None:
+        """
+        Initialize an asyncio-native SnowCat (^=w=^), so many course polls can be in flight on one event loop
+
+        :param level:       the lowest printing level for the embedded logger
+        :param config_path: the path of the user config file, which contains uiuc_portal_username and uiuc_portal_password
+        :param pool_size:   the number of keep-alive connections kept in the async http client
+        :param max_retries: the number of retries (with backoff, within the deadline) of an idempotent request failing to connect or answered 502/503/504
+        :param keep_context: whether the logged-in browser context is kept alive across refreshes (the browser always is)
+        :param storage_state_path: where the browser storage state (cookies, local storage, trusted-browser token) is persisted, None to disable
+        :param proactive_refresh: whether the token is refreshed in the background shortly before its learned lifetime runs out
+        :param refresh_margin: the fraction of the learned token lifetime after which the background refresh kicks in
+        :param refresh_mode: 'http' to prime the search session over the async client (browser only for SSO/DUO, switching to 'browser' for good if the priming is still rejected right after signing in), 'browser' to drive the whole Banner UI
+        :param block_resources: the resource types aborted by the refresh browser (analytics hosts are always aborted), None to load everything
+        :param viewport: the viewport of the refresh browser, defaults to a small 1024x768 one
+        :param page_size: the page size of a full section listing, further pages are only requested if a course has more sections
+        :param json_backend: the json decoder of the searchResults payloads, see load_json_decoder
+        :param fields: the section fields kept after decoding (e.g. SnowCat.WATCH_FIELDS), courseReferenceNumber is always kept, None to keep every field; the full section stays available through full_section
+        :param records: whether fetch returns compact Section records (read-only Mappings keyed like Banner, see Section.to_dict) instead of raw dicts, fields then only picks the extra fields kept
+        :param rate_limiter: the per-host token buckets every fetch and refresh goes through, defaults to the process-wide RateLimiter.shared()
+        :param notifier: the notifier backend (a Notifier, or a name for get_notifier), None to only log
+        :param notify_window: the seconds a burst of notifications is coalesced for
+        :param breaker: the circuit breaker around Banner, rejecting fetches and refreshes while it is down, defaults to the process-wide CircuitBreaker.shared()
+        :param connect_timeout: the seconds to wait for a connection to Banner
+        :param read_timeout: the seconds to wait for Banner to send the next bytes of a response
+        :param fetch_deadline: the seconds a whole fetch (every page) or the http priming of a refresh may take, None for no deadline
+        :param refresh_deadline: the seconds a refresh (including a DUO push) may take before it is cancelled, None for no deadline
+        :param hedge_percentile: the latency percentile (e.g. 95) after which a duplicate searchResults request is sent over another pooled connection, None to not hedge
+        :param hedge_max_rate: the largest fraction of searchResults requests hedged
+        :param token_cache: the token cache shared with the other watchers of the same NetID (see get_token_cache), one refresh then serves all of them
+        """
+
+        super().__init__(
+            level=level,
+            config_path=config_path,
+            keep_context=keep_context,
+            storage_state_path=storage_state_path,
+            proactive_refresh=proactive_refresh,
+            refresh_margin=refresh_margin,
+            refresh_mode=refresh_mode,
+            block_resources=block_resources,
+            viewport=viewport,
+            page_size=page_size,
+            json_backend=json_backend,
+            fields=fields,
+            records=records,
+            rate_limiter=rate_limiter,
+            notifier=notifier,
+            notify_window=notify_window,
+            breaker=breaker,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            max_retries=max_retries,
+            fetch_deadline=fetch_deadline,
+            refresh_deadline=refresh_deadline,
+            hedge_percentile=hedge_percentile,
+            hedge_max_rate=hedge_max_rate,
+            token_cache=token_cache
+        )
+
+        # init async http client, without transport retries since _request retries itself within the deadline
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+        self.client = httpx.AsyncClient(
+            transport=RateLimitedTransport(transport, self.rate_limiter),
+            headers={"Connection": "keep-alive"}
+        )
+
+        # init refresh coordination, so concurrent expirations only launch one browser
+        self._refresh_lock = asyncio.Lock()
+        self._proactive_task = None
+        self._stop_event = asyncio.Event()
+
+        # init the pending trigger tasks, referenced here so they are not garbage collected while running
+        self._trigger_tasks = set()
+
+    async def close(self) -> None:
+        """
+        Release the async http client, the pooled connections, the persistent browser and the notifier held by this SnowCat
+
+        :return: None
+        """
+
+        if self.notifier is not None:
+            await asyncio.to_thread(self.notifier.close)
+        if self.hedger is not None:
+            self.logger.info(role="hedge", message=f"hedged {self.hedger.rate:.1%} of searchResults requests: {self.hedger.report()}")
+        self._stop_event.set()
+        if self._proactive_task is not None:
+            self._proactive_task.cancel()
+        await self.client.aclose()
+        await self._close_browser()
+
+    async def fetch(
+        self,
+        course_abb: str,
+        course_num: str,
+        course_ids: Optional[int | str | list[int | str] | tuple[int | str, ...] | set[int | str] | frozenset[str]] = None
+    ) -> PollResult:
+        """
+        Execute the course information fetching without blocking the event loop
+
+        :param course_abb: The abbreviation of the course (e.g. CS for Computer Science)
+        :param course_num: The number of the course (e.g. 498 is the course number for CS498)
+        :param course_ids: All course IDs that you are interested in (the 5-digit course id you can find in either the course explorer or the register portal)
+        :return: A list of course config information, including the seat availability, flagged whether it changed since the last poll
+        """
+
+        params = self._build_query(course_abb, course_num)
+        headers = self.headers
+        deadline = self._deadline(self.fetch_deadline)
+
+        # 1) ask for the single watched CRN only, if Banner honours the narrow query
+        crn = self._narrow_crn(course_ids)
+        if crn is not None:
+            response, changed = await self._poll(self._narrow_query(params, crn), headers, deadline)
+            if self._check_narrow(response, crn):
+                return PollResult(self._parse_candidates(response, course_ids), changed=changed)
+
+        # 2) otherwise list every section, page by page
+        response, changed = await self._poll(params, headers, deadline)
+        while (offset := self._next_page_offset(response)) is not None:
+            page, page_changed = await self._poll(dict(params, pageOffset=offset), headers, deadline)
+            if not page.get("data"):
+                break
+            response = dict(response, data=response["data"] + page["data"])
+            changed = changed or page_changed
+
+        return PollResult(self._parse_candidates(response, course_ids), changed=changed)
+
+    async def _poll(self, params: Dict, headers: Dict, deadline: Optional[float] = None) -> tuple[Dict, bool]:
+        """
+        send one conditional searchResults request over the async client
+
+        :param params:      the query params
+        :param headers:     the refreshed headers
+        :param deadline:    the time.monotonic() by which the whole fetch has to be done, None for no deadline
+        :return: the decoded json body, and whether it changed since the last poll of the same query
+        """
+
+        await self._guard_upstream()
+
+        key = self._poll_key(params)
+        # the token is drawn before the hedger times the request, so a wait on the limiter never reads as a slow Banner
+        await self.rate_limiter.acquire_async(self.prefix)
+        request = functools.partial(
+            self._request, "searchResults", "GET", self.prefix, deadline,
+            prepaid=True,
+            params=params,
+            headers=self._conditional_headers(key, headers)
+        )
+        try:
+            if self.hedger is not None:
+                response = await self.hedger.call_async(request, admit=functools.partial(self.rate_limiter.try_acquire_async, self.prefix))
+            else:
+                response = await request()
+        except NetworkError:
+            self._record_upstream(None)
+            raise
+        self._record_upstream(response.status_code)
+        return self._resolve_poll(key, response.status_code, response.headers, response.content)
+
+    async def _request(
+        self,
+        name: str,
+        method: str,
+        url: str,
+        deadline: Optional[float] = None,
+        prepaid: bool = False,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        send one request over the async client with the connect/read timeouts, recording the timing of every attempt,
+        and retrying an idempotent request that failed to connect or got a gateway error while the deadline leaves time for it
+
+        :param name:        what is requested, the name of the attempt
+        :param method:      the http method
+        :param url:         the url
+        :param deadline:    the time.monotonic() by which the call has to be done, None for no deadline
+        :param prepaid:     whether the rate limiter token of the first try is already drawn
+        :param kwargs:      the arguments of client.request
+        :return: the response
+        """
+
+        idempotent = method.upper() in self.RETRY_METHODS
+        retry = 0
+        while True:
+            # every try draws its token before it is timed, the limiter wait is not Banner latency
+            if not prepaid:
+                await self.rate_limiter.acquire_async(url)
+            prepaid = False
+            connect, read = self._request_timeout(deadline)
+            started_at = time.monotonic()
+            try:
+                with self.rate_limiter.prepaid():
+                    response = await self.client.request(method, url, timeout=httpx.Timeout(read, connect=connect), **kwargs)
+            except httpx.ConnectTimeout as e:
+                self.attempts.record(name, started_at, error=e)
+                # the request never left, so it is safe to send again whatever the method
+                if (delay := self._retry_delay(retry, deadline)) is None:
+                    raise DeadlineError(f"{name} timed out connecting after {time.monotonic() - started_at:.1f}s") from e
+            except httpx.TimeoutException as e:
+                self.attempts.record(name, started_at, error=e)
+                raise DeadlineError(f"{name} timed out after {time.monotonic() - started_at:.1f}s") from e
+            except httpx.ConnectError as e:
+                self.attempts.record(name, started_at, error=e)
+                if not idempotent or (delay := self._retry_delay(retry, deadline)) is None:
+                    raise NetworkError(f"{name} failed to reach Banner: {e}") from e
+            except httpx.TransportError as e:
+                self.attempts.record(name, started_at, error=e)
+                raise NetworkError(f"{name} failed to reach Banner: {e}") from e
+            else:
+                self.attempts.record(name, started_at, status=response.status_code)
+                if not idempotent or response.status_code not in self.RETRY_STATUSES or (delay := self._retry_delay(retry, deadline)) is None:
+                    return response
+                await response.aclose()
+
+            retry += 1
+            self.logger.debug(role="fetch", message=f"{name} retry #{retry} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _guard_upstream(self) -> None:
+        """
+        let a request through unless the circuit around Banner is open, sending the single cheap probe once it is due
+
+        :return: None
+        """
+
+        probe = self.breaker.allow()
+        if probe is None:
+            retry_in = self.breaker.retry_in()
+            raise CircuitOpenError(f"Banner is down, next probe in {retry_in:.0f}s", retry_after=retry_in)
+        if not probe:
+            return
+
+        # whatever the probe runs into, its outcome is reported, or the circuit would stay half open for good
+        status_code = None
+        try:
+            response = await self._request(
+                "probe", "GET", f"{self.ssb_prefix}/classSearch/getTerms",
+                params={"searchTerm": "", "offset": 1, "max": 1}
+            )
+            status_code = response.status_code
+        except NetworkError:
+            pass
+        finally:
+            self._record_upstream(status_code)
+
+        if self.breaker.state != CircuitBreaker.CLOSED:
+            retry_in = self.breaker.retry_in()
+            raise CircuitOpenError(f"Banner is still down, next probe in {retry_in:.0f}s", retry_after=retry_in)
+        self.logger.info(role="breaker", message="Banner answered the probe, closing the circuit")
+
+    async def _close_browser(self) -> None:
+        """
+        tear down the persistent browser (and the kept context), ignoring the errors of an already crashed browser
+
+        :return: None
+        """
+
+        for closable in (self._context, self._browser):
+            if closable is not None:
+                try:
+                    await closable.close()
+                except Exception:
+                    pass
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+
+        self._context = None
+        self._browser = None
+        self._playwright = None
+
+    async def _ensure_browser(self) -> None:
+        """
+        health-check the persistent browser, and (re)launch it if it was never started or has crashed
+
+        :return: None
+        """
+
+        if self._browser is not None and self._browser.is_connected():
+            return
+
+        if self._browser is not None:
+            self.logger.warning(message="Browser is disconnected, relaunching", role="refresh")
+        await self._close_browser()
+
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True, args=self.LEAN_CHROMIUM_ARGS)
+
+    async def _open_page(self, timeout: int):
+        """
+        open a page on the persistent browser, reusing the kept (possibly logged-in) context when there is one
+
+        :param timeout: The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :return: the opened page
+        """
+
+        await self._ensure_browser()
+        if self._context is None:
+            if self.storage_state_path is not None and self.storage_state_path.is_file():
+                self._context = await self._browser.new_context(
+                    storage_state=self.storage_state_path,
+                    viewport=self.viewport
+                )
+                self._context_from_state = True
+            else:
+                self._context = await self._browser.new_context(viewport=self.viewport)
+                self._context_from_state = False
+            await self._context.route("**/*", self._route_resource)
+
+        page = await self._context.new_page()
+        page.set_default_timeout(timeout)
+        return page
+
+    async def _release_page(self, page, healthy: bool) -> None:
+        """
+        close the refresh page, and drop the context unless it is kept and known to be healthy
+
+        :param page:    the page opened by _open_page
+        :param healthy: whether the refresh on this page succeeded
+        :return: None
+        """
+
+        try:
+            await page.close()
+        except Exception:
+            pass
+
+        if not (self.keep_context and healthy) and self._context is not None:
+            try:
+                await self._context.close()
+            except Exception:
+                pass
+            self._context = None
+
+    async def _save_storage_state(self) -> None:
+        """
+        persist the storage state of the logged-in context, so the next refresh can reload it instead of logging in
+
+        :return: None
+        """
+
+        if self.storage_state_path is None or self._context is None:
+            return
+
+        try:
+            self.storage_state_path.parent.mkdir(parents=True, exist_ok=True)
+            # the state holds the SSO cookies & the DUO trusted-browser token, written 0600 from the start
+            write_private(self.storage_state_path, json.dumps(await self._context.storage_state()))
+        except Exception as e:
+            self.logger.warning(message=f"failed to save storage state: {e}", role="refresh")
+
+    async def _route_resource(self, route) -> None:
+        """
+        abort the non-essential resources of the Banner and SSO pages, so the refresh page settles sooner
+
+        :param route: the intercepted route
+        :return: None
+        """
+
+        if self._is_blocked(route.request):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    @staticmethod
+    async def _needs_login(page) -> bool:
+        """
+        tell whether the register page asks for the netid login, or the kept context is still logged in
+
+        :param page: the page which just clicked the register link
+        :return: True if the login form is shown
+        """
+
+        login_form = page.locator("#netid")
+        term_select = page.locator("#s2id_txt_term")
+        await login_form.or_(term_select).first.wait_for(state="visible")
+        return await login_form.is_visible()
+
+    async def _login(self, page, timeout: int) -> None:
+        """
+        send the netid & password, then wait for the DUO verification to be approved
+
+        :param page:    the page showing the login form
+        :param timeout: The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :return: None
+        """
+
+        # 3) send netid & password
+        await page.locator("#netid").fill(self.username)
+        await page.locator("#easpass").fill(self.password)
+        await page.locator('input[name="BTN_LOGIN"]').click()
+
+        # 4) wait for DUO verification
+        try_again_btn = page.locator("button.try-again-button")
+        trust_btn = page.locator("#trust-browser-button")
+        term_select = page.locator("#s2id_txt_term")
+
+        while True:
+            try_again_visible = await try_again_btn.is_visible()
+            trust_visible = await trust_btn.is_visible()
+
+            if await term_select.is_visible():
+                # the browser is still trusted by DUO, no push needed
+                break
+            elif try_again_visible and (not trust_visible):
+                await try_again_btn.first.click()
+                await page.wait_for_load_state("domcontentloaded")
+                continue
+            elif (not try_again_visible) and (not trust_visible):
+                await page.wait_for_timeout(max(10, timeout // 10))
+            elif (not try_again_visible) and trust_visible:
+                await trust_btn.click()
+                break
+
+    @staticmethod
+    async def _select_term(page) -> None:
+        """
+        select the latest term on the term selection page
+
+        :param page: the page showing the term selection
+        :return: None
+        """
+
+        # 6) select the term
+        await page.locator("#s2id_txt_term").click()
+        await page.locator("ul.select2-results li.select2-result-selectable").first.click()
+        await page.locator("#term-go").click()
+        await page.wait_for_load_state("networkidle")
+
+    @staticmethod
+    async def _capture_search_request(page, course_field: str, course_num: int | str, timeout: int):
+        """
+        search the course on the class search page and capture the searchResults request it sends
+
+        :param page:            the page showing the class search
+        :param course_field:    The full name of the course field (e.g. Computer Science is the course_field of CS)
+        :param course_num:      The number of the course (e.g. 498 is the course number for CS498)
+        :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :return: the captured request
+        """
+
+        # 7) fill out subject + course number
+        async with page.expect_request(lambda r: "searchResults?txt_subject" in r.url) as req_info:
+            subject = page.locator("#s2id_txt_subject")
+            subject_input = subject.locator("li.select2-search-field input.select2-input")
+            await subject_input.fill(course_field)
+            results = page.locator("ul.select2-results li.select2-result-selectable")
+            await results.first.wait_for(state="visible")
+
+            while True:
+                if await results.count() == 1:
+                    await results.first.click()
+                    break
+                else:
+                    await page.wait_for_timeout(max(10, timeout // 100))
+                    continue
+
+            await page.locator("#txt_courseNumber").fill(str(course_num))
+            await page.locator("#txt_courseNumber").press("Enter")
+        return await req_info.value
+
+    async def refresh(
+        self,
+        course_field: str,
+        course_num: int | str,
+        timeout: int = 10*1000,
+        token_version: Optional[int] = None
+    ) -> None:
+        """
+        Refreshes tokens such as cookies, headers, params, and sessions ... therefore the next request will stay valid
+
+        :param course_field:    The full name of the course field (e.g. Computer Science is the course_field of CS)
+        :param course_num:      The number of the course (e.g. 498 is the course number for CS498)
+        :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param token_version:   The token version the caller saw failing, the refresh is skipped if a newer token already exists
+        :return: None
+        """
+
+        async with self._refresh_lock:
+            if token_version is not None and token_version != self._token_version:
+                self.logger.debug(message="Token already refreshed by another watcher", role="refresh")
+                return
+
+            self._refresh_target = (course_field, course_num, timeout)
+
+            # no browser is launched while Banner is down
+            await self._guard_upstream()
+
+            if self.token_cache is None:
+                await self._refresh_token(course_field, course_num, timeout)
+                return
+
+            # single flight: whoever holds the lock of the NetID refreshes, every other watcher adopts its token,
+            # the cache is read, written and locked on a thread since it blocks on file locks or redis
+            if self._adopt_token(await asyncio.to_thread(self._read_cached_token)):
+                return
+            locked = await asyncio.to_thread(self.token_cache.acquire, self._cache_key, self.refresh_deadline)
+            try:
+                if not locked:
+                    self.logger.warning(message="Timed out waiting for the refresh of another watcher, refreshing anyway", role="refresh")
+                elif self._adopt_token(await asyncio.to_thread(self._read_cached_token)):
+                    return
+                await self._refresh_token(course_field, course_num, timeout)
+                with self._token_lock:
+                    headers, params = self.headers, self.params
+                await asyncio.to_thread(self._put_cached_token, headers, params, self._export_cookies())
+            finally:
+                if locked:
+                    await asyncio.to_thread(self.token_cache.release, self._cache_key)
+
+    async def _refresh_token(self, course_field: str, course_num: int | str, timeout: int) -> None:
+        """
+        refresh the token in the configured refresh mode within the refresh deadline, recording the timing of the refresh
+
+        :param course_field:    The full name of the course field (e.g. Computer Science is the course_field of CS)
+        :param course_num:      The number of the course (e.g. 498 is the course number for CS498)
+        :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :return: None
+        """
+
+        self.logger.info(message="Token is expired, start fetching new token", role="refresh")
+
+        if self.refresh_mode == "http":
+            call = self._refresh_over_http(course_field, course_num, timeout)
+        else:
+            call = self._refresh_over_browser(course_field, course_num, timeout)
+
+        started_at = time.monotonic()
+        try:
+            await asyncio.wait_for(call, timeout=self.refresh_deadline)
+        except asyncio.TimeoutError as e:
+            self.attempts.record("refresh", started_at, error=e)
+            raise DeadlineError(f"refresh exceeded its {self.refresh_deadline}s deadline") from e
+        except Exception as e:
+            self.attempts.record("refresh", started_at, error=e)
+            raise
+        attempt = self.attempts.record("refresh", started_at)
+
+        self.logger.info(message=f"Token successfully refreshed in {attempt.elapsed:.1f}s", role="refresh")
+
+    def _export_cookies(self) -> list:
+        """
+        the cookies of the async client, in the form the token cache keeps them
+
+        :return: the cookies as dicts of name, value, domain and path
+        """
+
+        return [
+            {"name": cookie.name, "value": cookie.value, "domain": cookie.domain, "path": cookie.path}
+            for cookie in self.client.cookies.jar
+        ]
+
+    def _import_cookies(self, cookies: list) -> None:
+        """
+        set cookies taken from the token cache on the async client
+
+        :param cookies: the cookies as dicts of name, value, domain and path
+        :return: None
+        """
+
+        for cookie in cookies:
+            self.client.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"])
+
+    async def _refresh_over_browser(self, course_field: str, course_num: int | str, timeout: int) -> None:
+        """
+        refresh the token by driving the whole Banner UI and capturing the searchResults request it sends
+
+        :param course_field:    The full name of the course field (e.g. Computer Science is the course_field of CS)
+        :param course_num:      The number of the course (e.g. 498 is the course number for CS498)
+        :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :return: None
+        """
+
+        # 0) open a page on the persistent browser
+        await self.rate_limiter.acquire_async(self.refresh_prefix)
+        page = await self._open_page(timeout)
+        healthy = False
+
+        try:
+            # 1) open register page & 2) the login page, skipped if the kept context is still logged in
+            await self._enter_registration(page, timeout)
+
+            await self._select_term(page)
+            req = await self._capture_search_request(page, course_field, course_num, timeout)
+
+            # 9) take the header & params of the refreshed request
+            self._swap_token(self._filter_headers(await req.all_headers()), self._params_from_url(req.url, self.params))
+            await self._save_storage_state()
+            healthy = True
+
+        finally:
+            await self._release_page(page, healthy)
+
+    async def _enter_registration(self, page, timeout: int) -> None:
+        """
+        open the register page and log in (with DUO) unless the context is still logged in
+
+        :param page:    the page opened by _open_page
+        :param timeout: The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :return: None
+        """
+
+        # 1) open register page
+        await page.goto(self.refresh_prefix, wait_until="domcontentloaded")
+
+        # 2) open the login page, skipped if the kept context is still logged in
+        await page.locator("#registerLink").click()
+        if await self._needs_login(page):
+            if self._context_from_state:
+                self.logger.info(message="Saved storage state is rejected, falling back to full login", role="refresh")
+            await self._login(page, timeout)
+        else:
+            self.logger.debug(message="Context is still logged in, skipping login", role="refresh")
+
+    async def _sign_in(self, timeout: int) -> None:
+        """
+        use the browser only for the SSO/DUO step, then hand its cookies over to the async client
+
+        :param timeout: The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :return: None
+        """
+
+        await self.rate_limiter.acquire_async(self.refresh_prefix)
+        page = await self._open_page(timeout)
+        healthy = False
+
+        try:
+            await self._enter_registration(page, timeout)
+            await page.locator("#s2id_txt_term").wait_for(state="visible")
+
+            for cookie in await self._context.cookies():
+                self.client.cookies.set(
+                    cookie["name"], cookie["value"],
+                    domain=cookie["domain"], path=cookie["path"]
+                )
+            await self._save_storage_state()
+            healthy = True
+
+        finally:
+            await self._release_page(page, healthy)
+
+    async def _prime_search_session(self) -> tuple[Dict, Dict]:
+        """
+        replay the term selection and search priming calls of the Banner UI over the async client
+
+        :return: the headers & params for the following searchResults requests
+        """
+
+        headers = {
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "X-Requested-With": "XMLHttpRequest",
+        }
+        unique_session_id = self._new_unique_session_id()
+        deadline = self._deadline(self.fetch_deadline)
+
+        # 1) list the terms, the first one is what the UI selects
+        response = await self._request(
+            "getTerms", "GET", f"{self.ssb_prefix}/classSearch/getTerms", deadline,
+            params={"searchTerm": "", "offset": 1, "max": 10},
+            headers=headers
+        )
+        if response.status_code != 200:
+            raise ValueError(f"session cookie is rejected, state: {response.status_code}")
+        term = response.json()[0]["code"]
+
+        # 2) select the term for this uniqueSessionId
+        response = await self._request(
+            "term/search", "POST", f"{self.ssb_prefix}/term/search", deadline,
+            params={"mode": "search"},
+            data={
+                "term": term,
+                "studyPath": "",
+                "studyPathText": "",
+                "startDatepicker": "",
+                "endDatepicker": "",
+                "uniqueSessionId": unique_session_id,
+            },
+            headers=headers
+        )
+        if response.status_code != 200:
+            raise ValueError(f"failed to select term {term}, state: {response.status_code}")
+
+        # 3) reset the search form, as the UI does before every search
+        await self._request("resetDataForm", "POST", f"{self.ssb_prefix}/classSearch/resetDataForm", deadline, headers=headers)
+
+        return headers, {"txt_term": term, "uniqueSessionId": unique_session_id}
+
+    async def _refresh_over_http(self, course_field: str, course_num: int | str, timeout: int) -> None:
+        """
+        refresh the token over the async client, signing in through the browser only if the session cookie is rejected,
+        and falling back to the browser refresh for good if the replayed priming does not work on this Banner
+
+        :param course_field:    The full name of the course field (e.g. Computer Science is the course_field of CS)
+        :param course_num:      The number of the course (e.g. 498 is the course number for CS498)
+        :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :return: None
+        """
+
+        try:
+            headers, params = await self._prime_search_session()
+        except NetworkError:
+            # an unreachable Banner is not fixed by signing in again
+            raise
+        except Exception as e:
+            self.logger.debug(message=f"Priming over http failed due to {str(e)}, signing in through the browser", role="refresh")
+            await self._sign_in(timeout)
+            try:
+                headers, params = await self._prime_search_session()
+            except NetworkError:
+                raise
+            except Exception as e:
+                # freshly signed in and still rejected, the replayed calls do not fit this Banner
+                self.logger.warning(message=f"Priming over http failed after signing in due to {str(e)}, switching to the browser refresh mode", role="refresh")
+                self.refresh_mode = "browser"
+                await self._refresh_over_browser(course_field, course_num, timeout)
+                return
+
+        self._swap_token(headers, params)
+
+    async def _proactive_refresh_loop(self) -> None:
+        """
+        the background task refreshing the token shortly before it expires, so the watchers never stall on a refresh
+
+        :return: None
+        """
+
+        while not self._stop_event.is_set():
+            due_in = self._refresh_due_in()
+            if due_in is None or self._refresh_target is None:
+                await asyncio.sleep(5)
+                continue
+            if due_in > 0:
+                await asyncio.sleep(min(due_in, 60))
+                continue
+
+            course_field, course_num, timeout = self._refresh_target
+            self.logger.info(message="Token is about to expire, refreshing in background", role="refresh")
+            try:
+                await self.refresh(course_field, course_num, timeout=timeout, token_version=self._token_version)
+            except Exception as e:
+                self.logger.error(message=f"Background refresh failed due to {str(e)}", role="refresh")
+                await asyncio.sleep(max(5.0, getattr(e, "retry_after", None) or 0))
+
+    async def _run_trigger(
+        self,
+        on_trigger: Callable,
+        response_list: List[Dict],
+        previous: Optional[asyncio.Task],
+        trigger_timeout: float
+    ) -> None:
+        """
+        run the trigger after the previous one of the same course, coroutine triggers are awaited and plain ones go to a thread
+
+        :param on_trigger:      The function to call per success fetching
+        :param response_list:   The fetched course config information
+        :param previous:        The task of the previous trigger of the same course, if still pending
+        :param trigger_timeout: The seconds after which the trigger is abandoned
+        :return: None
+        """
+
+        if previous is not None:
+            await asyncio.wait({previous})
+
+        if inspect.iscoroutinefunction(on_trigger):
+            call = on_trigger(response_list, self.logger)
+        else:
+            call = asyncio.to_thread(on_trigger, response_list, self.logger)
+
+        try:
+            await asyncio.wait_for(call, timeout=trigger_timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(role="dispatch", message=f"trigger running over {trigger_timeout}s, abandoned")
+        except Exception as e:
+            self.logger.error(role="dispatch", message=f"trigger failed due to {str(e)}")
+
+    def _dispatch(
+        self,
+        on_trigger: Callable,
+        response_list: List[Dict],
+        previous: Optional[asyncio.Task],
+        trigger_timeout: float,
+        max_pending: int
+    ) -> Optional[asyncio.Task]:
+        """
+        schedule the trigger as a task, so the watcher keeps polling while it runs
+
+        :param on_trigger:      The function to call per success fetching
+        :param response_list:   The fetched course config information
+        :param previous:        The task of the previous trigger of the same course, if any
+        :param trigger_timeout: The seconds after which the trigger is abandoned
+        :param max_pending:     The number of triggers pending at the same time, further ones are deferred
+        :return: the task of the trigger, None if it was deferred since too many are pending
+        """
+
+        if len(self._trigger_tasks) >= max_pending:
+            self.logger.warning(role="dispatch", message="too many pending triggers, deferring one to a later poll")
+            return None
+
+        if previous is not None and previous.done():
+            previous = None
+
+        task = asyncio.create_task(self._run_trigger(on_trigger, response_list, previous, trigger_timeout))
+        self._trigger_tasks.add(task)
+        task.add_done_callback(self._trigger_tasks.discard)
+        return task
+
+    async def _watch_one(
+        self,
+        spec: Dict,
+        key: int,
+        scheduler: AdaptiveScheduler,
+        timeout: int,
+        semaphore: asyncio.Semaphore,
+        trigger_timeout: float,
+        max_pending: int,
+        retry_policy: RetryPolicy
+    ) -> None:
+        """
+        the polling loop of a single course spec, sharing the client and the token with every other watcher
+
+        :param spec:        The course spec, a dict with course_field, course_abb, course_num, course_ids and on_trigger
+        :param key:         The key of the course in the scheduler
+        :param scheduler:   The scheduler adapting the interval of every course within the global budget
+        :param timeout:     The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param semaphore:   The bound of the polls in flight at the same time
+        :param trigger_timeout: The seconds after which a trigger is abandoned
+        :param max_pending: The number of triggers pending at the same time, further ones are deferred
+        :param retry_policy: The failure state machine of this course
+        :return: None
+        """
+
+        polled = False
+        trigger_task = None
+        # the latest candidates whose trigger could not be dispatched yet, they are delivered on a later poll
+        deferred = None
+        course_name = str(spec["course_abb"]) + str(spec["course_num"])
+
+        while True:
+            token_version = self._token_version
+            try:
+                async with semaphore:
+                    response_list = await self.fetch(spec["course_abb"], spec["course_num"], spec["course_ids"])
+                if failures := retry_policy.success():
+                    self.logger.info(role="SnowCat", message=f"{course_name} recovered after {failures} failed fetches")
+
+            except Exception as e:
+                decision = retry_policy.failure(e)
+                if decision.give_up:
+                    self.logger.error(role="SnowCat", message=f"Stop watching {course_name} after {retry_policy.failures} failures in a row, the last due to {str(e)}")
+                    self._notify(f"SnowCat stopped watching {course_name}", str(e))
+                    return
+
+                self.logger.error(role="SnowCat", message=f"{course_name} failed ({decision.kind} #{decision.attempt}) due to {str(e)}, retrying in {decision.delay:.1f}s")
+                if decision.alert:
+                    self._notify(f"SnowCat failing on {course_name} ({decision.kind})", f"{retry_policy.failures} failures in a row: {str(e)}")
+
+                await asyncio.sleep(decision.delay)
+                # only an expired session is worth a refresh, the other failures just back off
+                if decision.refresh:
+                    if decision.attempt == 1:
+                        self._observe_expiry()
+                    try:
+                        await self.refresh(spec["course_field"], spec["course_num"], timeout=timeout, token_version=token_version)
+                    except Exception as refresh_error:
+                        self.logger.error(role="SnowCat", message=f"Refresh failed due to {str(refresh_error)}")
+                continue
+
+            else:
+                changed = getattr(response_list, "changed", True)
+                if changed:
+                    deferred = response_list
+                if deferred is not None:
+                    task = self._dispatch(spec["on_trigger"], deferred, trigger_task, trigger_timeout, max_pending)
+                    if task is not None:
+                        trigger_task, deferred = task, None
+
+            # the first poll of a course always reads as changed, it is no churn
+            churned = changed and polled
+            polled = True
+            await asyncio.sleep(scheduler.record(key, churned))
+
+    async def watch(
+        self,
+        course_field: str,
+        course_abb: str,
+        course_num: int | str,
+        course_ids: Optional[int | str | list[int | str] | tuple[int | str, ...] | set[int | str]] = None,
+        on_trigger: Optional[Callable] = None,
+        interval: int = 15,
+        timeout: int = 10*1000,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        deadlines: Optional[List[datetime]] = None,
+        retry_policy: Callable[[], RetryPolicy] = RetryPolicy
+    ) -> None:
+        """
+        The main coroutine for watching the course availability + trigger specific actions when there is availability
+
+        :param course_field:    The full name of the course field (e.g. Computer Science is the course_field of CS)
+        :param course_abb:      The abbreviation of the course (e.g. CS for Computer Science)
+        :param course_num:      The number of the course (e.g. 498 is the course number for CS498)
+        :param course_ids:      All course IDs that you are interested in (the 5-digit course id you can find in either the course explorer or the register portal)
+        :param on_trigger:      The function (or coroutine function) to call per success fetching
+        :param interval:        The waiting time for a second course-availability-inquiry is initiated (in seconds)
+        :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param min_interval:    The shortest interval the polling tightens to while seats churn (in seconds), defaults to interval
+        :param max_interval:    The longest interval the polling relaxes to while the course is quiet (in seconds), defaults to interval
+        :param deadlines:       The add/drop deadlines, the polling runs at min_interval shortly before each of them
+        :param retry_policy:    The factory of the failure state machine of the course, never giving up by default
+        :return: None
+        """
+
+        await self.watch_many(
+            courses=[{
+                "course_field": course_field,
+                "course_abb": course_abb,
+                "course_num": course_num,
+                "course_ids": course_ids,
+            }],
+            on_trigger=on_trigger,
+            interval=interval,
+            timeout=timeout,
+            min_interval=min_interval,
+            max_interval=max_interval,
+            deadlines=deadlines,
+            retry_policy=retry_policy
+        )
+
+    async def watch_many(
+        self,
+        courses: List[Dict],
+        on_trigger: Optional[Callable] = None,
+        interval: int = 15,
+        timeout: int = 10*1000,
+        concurrency: int = 100,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        budget: Optional[float] = None,
+        deadlines: Optional[List[datetime]] = None,
+        trigger_timeout: float = 30,
+        max_pending_triggers: int = 64,
+        retry_policy: Callable[[], RetryPolicy] = RetryPolicy
+    ) -> None:
+        """
+        Watch several courses concurrently on one event loop, sharing the client and the refreshed token across all of them
+
+        :param courses:         The course specs, each a dict with course_field, course_abb, course_num and optionally course_ids / on_trigger
+        :param on_trigger:      The function (or coroutine function) to call per success fetching, for specs without their own on_trigger
+        :param interval:        The starting waiting time for a second course-availability-inquiry of a course (in seconds)
+        :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param concurrency:     The maximum number of polls in flight at the same time
+        :param min_interval:    The shortest interval a course tightens to while its seats churn (in seconds), defaults to interval
+        :param max_interval:    The longest interval a course relaxes to while it is quiet (in seconds), defaults to interval
+        :param budget:          The request budget of all courses together (in requests per minute), None for unbounded
+        :param deadlines:       The add/drop deadlines, every course polls at min_interval shortly before each of them
+        :param trigger_timeout: The seconds after which a trigger is abandoned, triggers run as tasks so polling goes on while they alert
+        :param max_pending_triggers: The number of triggers pending at the same time, further ones are deferred to a later poll
+        :param retry_policy:    The factory of the failure state machine of every course, never giving up by default
+        :return: None
+        """
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        specs = []
+        for course in courses:
+            spec = dict(course)
+            spec["course_ids"] = self._normalize_course_ids(spec.get("course_ids"))
+            if spec.get("on_trigger") is None:
+                spec["on_trigger"] = on_trigger or self._default_trigger(spec["course_abb"], spec["course_num"])
+            specs.append(spec)
+
+        if self.proactive_refresh and self._proactive_task is None:
+            self._proactive_task = asyncio.create_task(self._proactive_refresh_loop())
+
+        scheduler = AdaptiveScheduler(
+            interval=interval,
+            min_interval=min_interval,
+            max_interval=max_interval,
+            budget=budget,
+            deadlines=deadlines
+        )
+        for index in range(len(specs)):
+            scheduler.add(index)
+
+        await asyncio.gather(*(
+            self._watch_one(spec, index, scheduler, timeout, semaphore, trigger_timeout, max_pending_triggers, retry_policy())
+            for index, spec in enumerate(specs)
+        ))
+
+
+if __name__ == "__main__":
+    async def main():
+        cat = AsyncSnowCat(level='DEBUG')
+        try:
+            await cat.watch_many(
+                courses=[
+                    {"course_field": "Computer Science", "course_abb": "CS", "course_num": 498, "course_ids": 61698},
+                ],
+                on_trigger=None,
+                interval=15,
+                timeout=10*1000
+            )
+        finally:
+            await cat.close()
+
+    asyncio.run(main())
@@ -1,128 +1,628 @@
 import os
+import json
 import time
-import winsound
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
-from dotenv import load_dotenv
+from datetime import datetime
 from typing import List, Dict, Optional, Callable
 
 import requests
-from urllib.parse import urlparse, parse_qs
+from requests.adapters import HTTPAdapter
 from playwright.sync_api import sync_playwright
 
-from logger import Logger
+# PollResult and load_json_decoder live in base, they are still imported from here
+from base import BaseSnowCat, PollResult, load_json_decoder
+from scheduler import AdaptiveScheduler
+from ratelimit import RateLimiter
+from dispatcher import TriggerDispatcher
+from notifier import Notifier
+from register import AutoRegistrar
+from standby import StandbySession, StandbyPool
+from errors import NetworkError, DeadlineError, CircuitOpenError
+from retry import RetryPolicy
+from breaker import CircuitBreaker
+from tokencache import TokenCache
+from fileutil import write_private
 
 
-class SnowCat:
+class RateLimitedAdapter(HTTPAdapter):
+    def __init__(self, rate_limiter: RateLimiter, *args, **kwargs) -> None:
+        """
+        An http adapter drawing a token from the rate limiter before every request it sends
+
+        :param rate_limiter: the rate limiter shared by the requests
+        """
+
+        self.rate_limiter = rate_limiter
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        if not self.rate_limiter.take_prepaid():
+            self.rate_limiter.acquire(request.url)
+        return super().send(request, *args, **kwargs)
+
+
+class SnowCat(BaseSnowCat):
     def __init__(
         self,
         level: str = 'INFO',
-        config_path: os.PathLike | str = Path.cwd() / Path("../configs/.env.user_config")
+        config_path: os.PathLike | str = Path.cwd() / Path("../configs/.env.user_config"),
+        pool_size: int = 10,
+        max_retries: int = 3,
+        keep_context: bool = True,
+        storage_state_path: Optional[os.PathLike | str] = Path.cwd() / Path("../configs/.storage_state.json"),
+        proactive_refresh: bool = True,
+        refresh_margin: float = 0.8,
+        refresh_mode: str = 'http',
+        block_resources: Optional[tuple[str, ...]] = ("image", "font", "media"),
+        viewport: Optional[Dict] = None,
+        page_size: int = 500,
+        json_backend: str = 'auto',
+        fields: Optional[tuple[str, ...]] = None,
+        records: bool = False,
+        rate_limiter: Optional[RateLimiter] = None,
+        notifier: Optional[Notifier | str] = 'auto',
+        notify_window: float = 1.0,
+        standby: int = 0,
+        breaker: Optional[CircuitBreaker] = None,
+        connect_timeout: float = 5,
+        read_timeout: float = 15,
+        fetch_deadline: Optional[float] = 30,
+        refresh_deadline: Optional[float] = 300,
+        hedge_percentile: Optional[float] = None,
+        hedge_max_rate: float = 0.1,
+        token_cache: Optional[TokenCache] = None
     ) -> None:
         """
         Initialize a SnowCat (^=w=^) watching the course availability, and act accordingly if the course has a seat
 
         :param level:       the lowest printing level for the embedded logger
         :param config_path: the path of the user config file, which contains uiuc_portal_username and uiuc_portal_password
+        :param pool_size:   the number of keep-alive connections kept in the pooled http session
+        :param max_retries: the number of retries (with backoff, within the deadline) of an idempotent request failing to connect or answered 502/503/504
+        :param keep_context: whether the logged-in browser context is kept alive across refreshes (the browser always is)
+        :param storage_state_path: where the browser storage state (cookies, local storage, trusted-browser token) is persisted, None to disable
+        :param proactive_refresh: whether the token is refreshed in the background shortly before its learned lifetime runs out
+        :param refresh_margin: the fraction of the learned token lifetime after which the background refresh kicks in
+        :param refresh_mode: 'http' to prime the search session over the pooled session (browser only for SSO/DUO, switching to 'browser' for good if the priming is still rejected right after signing in), 'browser' to drive the whole Banner UI
+        :param block_resources: the resource types aborted by the refresh browser (analytics hosts are always aborted), None to load everything
+        :param viewport: the viewport of the refresh browser, defaults to a small 1024x768 one
+        :param page_size: the page size of a full section listing, further pages are only requested if a course has more sections
+        :param json_backend: the json decoder of the searchResults payloads, see load_json_decoder
+        :param fields: the section fields kept after decoding (e.g. SnowCat.WATCH_FIELDS), courseReferenceNumber is always kept, None to keep every field; the full section stays available through full_section
+        :param records: whether fetch returns compact Section records (read-only Mappings keyed like Banner, see Section.to_dict) instead of raw dicts, fields then only picks the extra fields kept
+        :param rate_limiter: the per-host token buckets every fetch and refresh goes through, defaults to the process-wide RateLimiter.shared()
+        :param notifier: the notifier backend (a Notifier, or a name for get_notifier), None to only log
+        :param notify_window: the seconds a burst of notifications is coalesced for
+        :param standby: the number of pre-authenticated sessions kept warm, a failed fetch rotates to one of them instead of refreshing
+        :param breaker: the circuit breaker around Banner, rejecting fetches and refreshes while it is down, defaults to the process-wide CircuitBreaker.shared()
+        :param connect_timeout: the seconds to wait for a connection to Banner
+        :param read_timeout: the seconds to wait for Banner to send the next bytes of a response
+        :param fetch_deadline: the seconds a whole fetch (every page) or the http priming of a refresh may take, None for no deadline
+        :param refresh_deadline: the seconds a refresh (including a DUO push) may take before it is given up, None for no deadline
+        :param hedge_percentile: the latency percentile (e.g. 95) after which a duplicate searchResults request is sent over another pooled connection, None to not hedge
+        :param hedge_max_rate: the largest fraction of searchResults requests hedged
+        :param token_cache: the token cache shared with the other watchers of the same NetID (see get_token_cache), one refresh then serves all of them
+        """
+
+        super().__init__(
+            level=level,
+            config_path=config_path,
+            keep_context=keep_context,
+            storage_state_path=storage_state_path,
+            proactive_refresh=proactive_refresh,
+            refresh_margin=refresh_margin,
+            refresh_mode=refresh_mode,
+            block_resources=block_resources,
+            viewport=viewport,
+            page_size=page_size,
+            json_backend=json_backend,
+            fields=fields,
+            records=records,
+            rate_limiter=rate_limiter,
+            notifier=notifier,
+            notify_window=notify_window,
+            breaker=breaker,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            max_retries=max_retries,
+            fetch_deadline=fetch_deadline,
+            refresh_deadline=refresh_deadline,
+            hedge_percentile=hedge_percentile,
+            hedge_max_rate=hedge_max_rate,
+            token_cache=token_cache
+        )
+
+        # init pooled keep-alive session
+        self._session_options = {"pool_size": pool_size, "rate_limiter": self.rate_limiter}
+        self.session = self._build_session(**self._session_options)
+
+        # init background refresh, every browser call runs on this single thread since playwright is thread-bound
+        self._refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SnowCat-refresh")
+        self._proactive_thread = None
+        self._stop_event = threading.Event()
+
+        # init hot-standby sessions, warmed on the refresh thread once the first token exists
+        self.standby = StandbyPool(
+            size=standby,
+            warm=self._warm_standby,
+            executor=self._refresh_executor,
+            logger=self.logger,
+            max_age=self._token_max_age
+        ) if standby > 0 else None
+
+    @staticmethod
+    def _build_session(pool_size: int, rate_limiter: RateLimiter) -> requests.Session:
+        """
+        Build the long-lived http session shared by every request of this SnowCat, so the TCP+TLS handshake is paid once
+
+        :param pool_size:       the number of keep-alive connections kept in the pool
+        :param rate_limiter:    the rate limiter every request of the session goes through
+        :return: the pooled session
         """
 
-        # init request config
-        self.prefix = "https://banner.apps.uillinois.edu/StudentRegistrationSSB/ssb/searchResults/searchResults"
-        self.refresh_prefix = "https://banner.apps.uillinois.edu/StudentRegistrationSSB/ssb/registration?mepCode=1UIUC#"
-        self.params = {}
-        self.headers = {}
+        # no urllib3 retries, _request retries itself so every try is its own attempt and the deadline holds across them
+        adapter = RateLimitedAdapter(rate_limiter, pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
 
-        # init user config
-        load_dotenv(config_path)
-        self.username = os.getenv("UIUC_USERNAME")
-        self.password = os.getenv("UIUC_PASSWORD")
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Connection"] = "keep-alive"
+        return session
 
-        # init fetching status
-        self.was_failed = False
+    def close(self) -> None:
+        """
+        Release the pooled connections, the persistent browser and the notifier held by this SnowCat
 
-        # init sync logger
-        self.logger = Logger(level=level)
+        :return: None
+        """
+
+        if self.notifier is not None:
+            self.notifier.close()
+        if self.standby is not None:
+            self.standby.close()
+        if self.hedger is not None:
+            self.logger.info(role="hedge", message=f"hedged {self.hedger.rate:.1%} of searchResults requests: {self.hedger.report()}")
+            self.hedger.close()
+        self._stop_event.set()
+        self.session.close()
+        self._refresh_executor.submit(self._close_browser).result()
+        self._refresh_executor.shutdown(wait=True)
 
     def fetch(
         self,
         course_abb: str,
         course_num: str,
-        course_ids: Optional[int | str | list[int | str] | tuple[int | str, ...] | set[int | str]] = None
-    ) -> List[Dict]:
+        course_ids: Optional[int | str | list[int | str] | tuple[int | str, ...] | set[int | str] | frozenset[str]] = None
+    ) -> PollResult:
         """
         Execute the course information fetching
 
         :param course_abb: The abbreviation of the course (e.g. CS for Computer Science)
         :param course_num: The number of the course (e.g. 498 is the course number for CS498)
         :param course_ids: All course IDs that you are interested in (the 5-digit course id you can find in either the course explorer or the register portal)
-        :return: A list of course config information, including the seat availability
+        :return: A list of course config information, including the seat availability, flagged whether it changed since the last poll
         """
 
-        self.params["txt_subject"] = course_abb
-        self.params["txt_courseNumber"] = course_num
-        self.params["pageOffset"] = 0
-        self.params["pageMaxSize"] = 10000
+        with self._token_lock:
+            params = self._build_query(course_abb, course_num)
+            headers = self.headers
+        deadline = self._deadline(self.fetch_deadline)
+
+        # 1) ask for the single watched CRN only, if Banner honours the narrow query
+        crn = self._narrow_crn(course_ids)
+        if crn is not None:
+            response, changed = self._poll(self._narrow_query(params, crn), headers, deadline)
+            if self._check_narrow(response, crn):
+                return PollResult(self._parse_candidates(response, course_ids), changed=changed)
 
-        response = requests.get(self.prefix, params=self.params, headers=self.headers)
-        response = response.json()
+        # 2) otherwise list every section, page by page
+        response, changed = self._poll(params, headers, deadline)
+        while (offset := self._next_page_offset(response)) is not None:
+            page, page_changed = self._poll(dict(params, pageOffset=offset), headers, deadline)
+            if not page.get("data"):
+                break
+            response = dict(response, data=response["data"] + page["data"])
+            changed = changed or page_changed
 
+        return PollResult(self._parse_candidates(response, course_ids), changed=changed)
+
+    def _poll(self, params: Dict, headers: Dict, deadline: Optional[float] = None) -> tuple[Dict, bool]:
+        """
+        send one conditional searchResults request over the pooled session
+
+        :param params:      the query params
+        :param headers:     the refreshed headers
+        :param deadline:    the time.monotonic() by which the whole fetch has to be done, None for no deadline
+        :return: the decoded json body, and whether it changed since the last poll of the same query
+        """
+
+        self._guard_upstream()
+
+        key = self._poll_key(params)
+        # the token is drawn before the hedger times the request, so a wait on the limiter never reads as a slow Banner
+        self.rate_limiter.acquire(self.prefix)
+        request = functools.partial(
+            self._request, "searchResults", self.session, "GET", self.prefix, deadline,
+            prepaid=True,
+            params=params,
+            headers=self._conditional_headers(key, headers),
+            allow_redirects=False
+        )
         try:
-            candidate_list = response["data"]
-            if self.was_failed:
-                self.logger.info(message="link reinitiated successfully", role="fetch")
+            if self.hedger is not None:
+                response = self.hedger.call(request, admit=functools.partial(self.rate_limiter.try_acquire, self.prefix))
+            else:
+                response = request()
+        except NetworkError:
+            self._record_upstream(None)
+            raise
+        self._record_upstream(response.status_code)
+        return self._resolve_poll(key, response.status_code, response.headers, response.content)
 
-            if course_ids is None:
-                if "success" in response:
-                    return candidate_list
-                else:
-                    self.logger.error(message=f"failed to initiate link", role="fetch")
-                    raise ValueError(f"failed to fetch, state: {response['success']}")
+    def _request(
+        self,
+        name: str,
+        session: requests.Session,
+        method: str,
+        url: str,
+        deadline: Optional[float] = None,
+        prepaid: bool = False,
+        **kwargs
+    ) -> requests.Response:
+        """
+        send one request with the connect/read timeouts, recording the timing of every attempt, and retrying an idempotent
+        request that failed to connect or got a gateway error while the deadline leaves time for it
+
+        :param name:        what is requested, the name of the attempt
+        :param session:     the session sending the request
+        :param method:      the http method
+        :param url:         the url
+        :param deadline:    the time.monotonic() by which the call has to be done, None for no deadline
+        :param prepaid:     whether the rate limiter token of the first try is already drawn
+        :param kwargs:      the arguments of session.request
+        :return: the response
+        """
+
+        idempotent = method.upper() in self.RETRY_METHODS
+        retry = 0
+        while True:
+            # every try draws its token before it is timed, the limiter wait is not Banner latency
+            if not prepaid:
+                self.rate_limiter.acquire(url)
+            prepaid = False
+            timeout = self._request_timeout(deadline)
+            started_at = time.monotonic()
+            try:
+                with self.rate_limiter.prepaid():
+                    response = session.request(method, url, timeout=timeout, **kwargs)
+            except requests.ConnectTimeout as e:
+                self.attempts.record(name, started_at, error=e)
+                # the request never left, so it is safe to send again whatever the method
+                if (delay := self._retry_delay(retry, deadline)) is None:
+                    raise DeadlineError(f"{name} timed out connecting after {time.monotonic() - started_at:.1f}s") from e
+            except requests.Timeout as e:
+                self.attempts.record(name, started_at, error=e)
+                raise DeadlineError(f"{name} timed out after {time.monotonic() - started_at:.1f}s") from e
+            except requests.ConnectionError as e:
+                self.attempts.record(name, started_at, error=e)
+                if not idempotent or (delay := self._retry_delay(retry, deadline)) is None:
+                    raise NetworkError(f"{name} failed to reach Banner: {e}") from e
+            except requests.RequestException as e:
+                self.attempts.record(name, started_at, error=e)
+                raise NetworkError(f"{name} failed to reach Banner: {e}") from e
             else:
-                if isinstance(course_ids, (list, tuple, set)):
-                    course_ids = list(str(ci) for ci in course_ids)
-                else:
-                    course_ids = [str(course_ids)]
+                self.attempts.record(name, started_at, status=response.status_code)
+                if not idempotent or response.status_code not in self.RETRY_STATUSES or (delay := self._retry_delay(retry, deadline)) is None:
+                    return response
+                response.close()
 
-                ret_list = [
-                    candidate for candidate in candidate_list
-                    if candidate["courseReferenceNumber"] in course_ids
-                ]
-                return ret_list
+            retry += 1
+            self.logger.debug(role="fetch", message=f"{name} retry #{retry} in {delay:.1f}s")
+            time.sleep(delay)
 
-        except Exception as e:
-            self.logger.error(message=f"failed to initiate link: {e}", role="fetch")
-            raise ValueError(f"failed to fetch: {e}, state: {response['success']}")
+    def _guard_upstream(self) -> None:
+        """
+        let a request through unless the circuit around Banner is open, sending the single cheap probe once it is due
+
+        :return: None
+        """
+
+        probe = self.breaker.allow()
+        if probe is None:
+            retry_in = self.breaker.retry_in()
+            raise CircuitOpenError(f"Banner is down, next probe in {retry_in:.0f}s", retry_after=retry_in)
+        if not probe:
+            return
+
+        # whatever the probe runs into, its outcome is reported, or the circuit would stay half open for good
+        status_code = None
+        try:
+            response = self._request(
+                "probe", self.session, "GET", f"{self.ssb_prefix}/classSearch/getTerms",
+                params={"searchTerm": "", "offset": 1, "max": 1},
+                allow_redirects=False
+            )
+            status_code = response.status_code
+        except NetworkError:
+            pass
+        finally:
+            self._record_upstream(status_code)
+
+        if self.breaker.state != CircuitBreaker.CLOSED:
+            retry_in = self.breaker.retry_in()
+            raise CircuitOpenError(f"Banner is still down, next probe in {retry_in:.0f}s", retry_after=retry_in)
+        self.logger.info(role="breaker", message="Banner answered the probe, closing the circuit")
+
+    def _proactive_refresh_loop(self) -> None:
+        """
+        the background worker refreshing the token shortly before it expires, so the polling never stalls on a refresh
+
+        :return: None
+        """
+
+        while not self._stop_event.is_set():
+            if self.standby is not None and self._token_version:
+                self.standby.maintain()
+
+            due_in = self._refresh_due_in()
+            if due_in is None or self._refresh_target is None:
+                self._stop_event.wait(5)
+                continue
+            if due_in > 0:
+                self._stop_event.wait(min(due_in, 60))
+                continue
+
+            course_field, course_num, timeout = self._refresh_target
+            self.logger.info(message="Token is about to expire, refreshing in background", role="refresh")
+            try:
+                self.refresh(course_field, course_num, timeout=timeout, token_version=self._token_version)
+            except Exception as e:
+                self.logger.error(message=f"Background refresh failed due to {str(e)}", role="refresh")
+                self._stop_event.wait(max(5.0, getattr(e, "retry_after", None) or 0))
 
-    def _update_headers_from_request(self, req) -> None:
+    def _start_proactive_refresh(self) -> None:
         """
-        update the headers from the refreshed request to pass the request validation
+        start the background refresh worker once, if enabled
 
-        :param req: the request config form the refreshed request
         :return: None
         """
 
-        if req is None:
+        if not self.proactive_refresh or self._proactive_thread is not None:
             return
-        self.headers = dict(req.all_headers())
 
-    def _update_params_from_request(self, req) -> None:
+        self._proactive_thread = threading.Thread(
+            target=self._proactive_refresh_loop,
+            name="SnowCat-proactive-refresh",
+            daemon=True
+        )
+        self._proactive_thread.start()
+
+    def _close_browser(self) -> None:
         """
-        update the params from the refreshed request to pass the request validation
+        tear down the persistent browser (and the kept context), ignoring the errors of an already crashed browser
 
-        :param req: the request config form the refreshed request
         :return: None
         """
 
-        if req is None:
+        for closable in (self._context, self._browser):
+            if closable is not None:
+                try:
+                    closable.close()
+                except Exception:
+                    pass
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception:
+                pass
+
+        self._context = None
+        self._browser = None
+        self._playwright = None
+
+    def _ensure_browser(self) -> None:
+        """
+        health-check the persistent browser, and (re)launch it if it was never started or has crashed
+
+        :return: None
+        """
+
+        if self._browser is not None and self._browser.is_connected():
             return
-        qs = parse_qs(urlparse(req.url).query)
-        if "uniqueSessionId" in qs and qs["uniqueSessionId"]:
-            self.params["uniqueSessionId"] = qs["uniqueSessionId"][0]
+
+        if self._browser is not None:
+            self.logger.warning(message="Browser is disconnected, relaunching", role="refresh")
+        self._close_browser()
+
+        self._playwright = sync_playwright().start()
+        self._browser = self._playwright.chromium.launch(headless=True, args=self.LEAN_CHROMIUM_ARGS)
+
+    def _open_page(self, timeout: int):
+        """
+        open a page on the persistent browser, reusing the kept (possibly logged-in) context when there is one
+
+        :param timeout: The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :return: the opened page
+        """
+
+        self._ensure_browser()
+        if self._context is None:
+            if self.storage_state_path is not None and self.storage_state_path.is_file():
+                self._context = self._browser.new_context(
+                    storage_state=self.storage_state_path,
+                    viewport=self.viewport
+                )
+                self._context_from_state = True
+            else:
+                self._context = self._browser.new_context(viewport=self.viewport)
+                self._context_from_state = False
+            self._context.route("**/*", self._route_resource)
+
+        page = self._context.new_page()
+        page.set_default_timeout(timeout)
+        return page
+
+    def _release_page(self, page, healthy: bool) -> None:
+        """
+        close the refresh page, and drop the context unless it is kept and known to be healthy
+
+        :param page:    the page opened by _open_page
+        :param healthy: whether the refresh on this page succeeded
+        :return: None
+        """
+
+        try:
+            page.close()
+        except Exception:
+            pass
+
+        if not (self.keep_context and healthy) and self._context is not None:
+            try:
+                self._context.close()
+            except Exception:
+                pass
+            self._context = None
+
+    def _save_storage_state(self) -> None:
+        """
+        persist the storage state of the logged-in context, so the next refresh can reload it instead of logging in
+
+        :return: None
+        """
+
+        if self.storage_state_path is None or self._context is None:
+            return
+
+        try:
+            self.storage_state_path.parent.mkdir(parents=True, exist_ok=True)
+            # the state holds the SSO cookies & the DUO trusted-browser token, written 0600 from the start
+            write_private(self.storage_state_path, json.dumps(self._context.storage_state()))
+        except Exception as e:
+            self.logger.warning(message=f"failed to save storage state: {e}", role="refresh")
+
+    def _route_resource(self, route) -> None:
+        """
+        abort the non-essential resources of the Banner and SSO pages, so the refresh page settles sooner
+
+        :param route: the intercepted route
+        :return: None
+        """
+
+        if self._is_blocked(route.request):
+            route.abort()
+        else:
+            route.continue_()
+
+    @staticmethod
+    def _needs_login(page) -> bool:
+        """
+        tell whether the register page asks for the netid login, or the kept context is still logged in
+
+        :param page: the page which just clicked the register link
+        :return: True if the login form is shown
+        """
+
+        login_form = page.locator("#netid")
+        term_select = page.locator("#s2id_txt_term")
+        login_form.or_(term_select).first.wait_for(state="visible")
+        return login_form.is_visible()
+
+    def _login(self, page, timeout: int, deadline: Optional[float] = None) -> None:
+        """
+        send the netid & password, then wait for the DUO verification to be approved
+
+        :param page:        the page showing the login form
+        :param timeout:     The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param deadline:    the time.monotonic() by which the refresh has to be done, None for no deadline
+        :return: None
+        """
+
+        # 3) send netid & password
+        page.locator("#netid").fill(self.username)
+        page.locator("#easpass").fill(self.password)
+        page.locator('input[name="BTN_LOGIN"]').click()
+
+        # 4) wait for DUO verification
+        try_again_btn = page.locator("button.try-again-button")
+        trust_btn = page.locator("#trust-browser-button")
+        term_select = page.locator("#s2id_txt_term")
+
+        while True:
+            # a push nobody approves must not hold the refresh thread for good
+            if deadline is not None and time.monotonic() >= deadline:
+                raise DeadlineError("DUO verification was not approved before the refresh deadline")
+            if term_select.is_visible():
+                # the browser is still trusted by DUO, no push needed
+                break
+            elif try_again_btn.is_visible() and (not trust_btn.is_visible()):
+                try_again_btn.first.click()
+                page.wait_for_load_state("domcontentloaded")
+                continue
+            elif (not try_again_btn.is_visible()) and (not trust_btn.is_visible()):
+                page.wait_for_timeout(max(10, timeout // 10))
+            elif (not try_again_btn.is_visible()) and trust_btn.is_visible():
+                trust_btn.click()
+                break
+
+    @staticmethod
+    def _select_term(page) -> None:
+        """
+        select the latest term on the term selection page
+
+        :param page: the page showing the term selection
+        :return: None
+        """
+
+        # 6) select the term
+        page.locator("#s2id_txt_term").click()
+        page.locator("ul.select2-results li.select2-result-selectable").first.click()
+        page.locator("#term-go").click()
+        page.wait_for_load_state("networkidle")
+
+    @staticmethod
+    def _capture_search_request(page, course_field: str, course_num: int | str, timeout: int, deadline: Optional[float] = None):
+        """
+        search the course on the class search page and capture the searchResults request it sends
+
+        :param page:            the page showing the class search
+        :param course_field:    The full name of the course field (e.g. Computer Science is the course_field of CS)
+        :param course_num:      The number of the course (e.g. 498 is the course number for CS498)
+        :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param deadline:        the time.monotonic() by which the refresh has to be done, None for no deadline
+        :return: the captured request
+        """
+
+        # 7) fill out subject + course number
+        with page.expect_request(lambda r: "searchResults?txt_subject" in r.url) as req_info:
+            subject = page.locator("#s2id_txt_subject")
+            subject_input = subject.locator("li.select2-search-field input.select2-input")
+            subject_input.fill(course_field)
+            results = page.locator("ul.select2-results li.select2-result-selectable")
+            results.first.wait_for(state="visible")
+
+            while True:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise DeadlineError(f"the subject {course_field} did not narrow down to one result before the refresh deadline")
+                if results.count() == 1:
+                    results.first.click()
+                    break
+                else:
+                    page.wait_for_timeout(max(10, timeout // 100))
+                    continue
+
+            page.locator("#txt_courseNumber").fill(str(course_num))
+            page.locator("#txt_courseNumber").press("Enter")
+        return req_info.value
 
     def refresh(
         self,
         course_field: str,
         course_num: int | str,
-        timeout: int = 10*1000
+        timeout: int = 10*1000,
+        token_version: Optional[int] = None
     ) -> None:
         """
         Refreshes tokens such as cookies, headers, params, and sessions ... therefore the next request will stay valid
@@ -130,78 +630,403 @@ class SnowCat:
         :param course_field:    The full name of the course field (e.g. Computer Science is the course_field of CS)
         :param course_num:      The number of the course (e.g. 498 is the course number for CS498)
         :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param token_version:   The token version the caller saw failing, the refresh is skipped if a newer token already exists
+        :return: None
+        """
+
+        future = self._refresh_executor.submit(self._refresh, course_field, course_num, timeout, token_version)
+        try:
+            future.result(timeout=self.refresh_deadline)
+        except FutureTimeoutError as e:
+            # the refresh keeps running on its thread until its own deadline, and still swaps the token in if done by then
+            raise DeadlineError(f"refresh exceeded its {self.refresh_deadline}s deadline") from e
+
+    def _refresh(
+        self,
+        course_field: str,
+        course_num: int | str,
+        timeout: int,
+        token_version: Optional[int]
+    ) -> None:
+        """
+        the body of refresh, always running on the refresh thread
+
+        :param course_field:    The full name of the course field (e.g. Computer Science is the course_field of CS)
+        :param course_num:      The number of the course (e.g. 498 is the course number for CS498)
+        :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param token_version:   The token version the caller saw failing, the refresh is skipped if a newer token already exists
+        :return: None
+        """
+
+        if token_version is not None and token_version != self._token_version:
+            self.logger.debug(message="Token already refreshed in background", role="refresh")
+            return
+
+        self._refresh_target = (course_field, course_num, timeout)
+        # the refresh itself gives up at its deadline, so a stuck DUO push does not hold the refresh thread for good
+        deadline = self._deadline(self.refresh_deadline)
+
+        # no browser is launched while Banner is down
+        self._guard_upstream()
+
+        if self.token_cache is None:
+            self._refresh_token(course_field, course_num, timeout, deadline)
+            return
+
+        # single flight: whoever holds the lock of the NetID refreshes, every other watcher adopts its token
+        if self._adopt_cached_token():
+            return
+        with self.token_cache.lock(self._cache_key, timeout=self.refresh_deadline) as locked:
+            if not locked:
+                self.logger.warning(message="Timed out waiting for the refresh of another watcher, refreshing anyway", role="refresh")
+            elif self._adopt_cached_token():
+                return
+            self._refresh_token(course_field, course_num, timeout, deadline)
+            self._store_cached_token()
+
+    def _refresh_token(self, course_field: str, course_num: int | str, timeout: int, deadline: Optional[float] = None) -> None:
+        """
+        refresh the token in the configured refresh mode, recording the timing of the refresh
+
+        :param course_field:    The full name of the course field (e.g. Computer Science is the course_field of CS)
+        :param course_num:      The number of the course (e.g. 498 is the course number for CS498)
+        :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param deadline:        the time.monotonic() by which the refresh has to be done, None for no deadline
         :return: None
         """
 
         self.logger.info(message="Token is expired, start fetching new token", role="refresh")
 
-        with sync_playwright() as p:
-            # 0) init driver
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context()
-            page = context.new_page()
-            page.set_default_timeout(timeout)
+        started_at = time.monotonic()
+        try:
+            if self.refresh_mode == "http":
+                self._refresh_over_http(course_field, course_num, timeout, deadline)
+            else:
+                self._refresh_over_browser(course_field, course_num, timeout, deadline)
+        except Exception as e:
+            self.attempts.record("refresh", started_at, error=e)
+            raise
+        attempt = self.attempts.record("refresh", started_at)
 
-            # 1) open register page
-            page.goto(self.refresh_prefix, wait_until="domcontentloaded")
+        self.logger.info(message=f"Token successfully refreshed in {attempt.elapsed:.1f}s", role="refresh")
 
-            # 2) open the login page
-            page.locator("#registerLink").click()
+    def _export_cookies(self) -> list:
+        """
+        the cookies of the pooled session, in the form the token cache keeps them
 
-            # 3) send netid & password
-            page.locator("#netid").fill(self.username)
-            page.locator("#easpass").fill(self.password)
-            page.locator('input[name="BTN_LOGIN"]').click()
+        :return: the cookies as dicts of name, value, domain and path
+        """
 
-            # 4) wait for DUO verification
-            try_again_btn = page.locator("button.try-again-button")
-            trust_btn = page.locator("#trust-browser-button")
+        return [
+            {"name": cookie.name, "value": cookie.value, "domain": cookie.domain, "path": cookie.path}
+            for cookie in self.session.cookies
+        ]
 
-            while True:
-                if try_again_btn.is_visible() and (not trust_btn.is_visible()):
-                    try_again_btn.first.click()
-                    page.wait_for_load_state("domcontentloaded")
-                    continue
-                elif (not try_again_btn.is_visible()) and (not trust_btn.is_visible()):
-                    page.wait_for_timeout(max(10, timeout // 10))
-                elif (not try_again_btn.is_visible()) and trust_btn.is_visible():
-                    trust_btn.click()
-                    break
+    def _import_cookies(self, cookies: list) -> None:
+        """
+        set cookies taken from the token cache on the pooled session
 
-            # 6) select the term
-            page.locator("#s2id_txt_term").click()
-            page.locator("ul.select2-results li.select2-result-selectable").first.click()
-            page.locator("#term-go").click()
-            page.wait_for_load_state("networkidle")
-
-            # 7) fill out subject + course number
-            with page.expect_request(lambda r: "searchResults?txt_subject" in r.url) as req_info:
-                subject = page.locator("#s2id_txt_subject")
-                subject_input = subject.locator("li.select2-search-field input.select2-input")
-                subject_input.fill(course_field)
-                results = page.locator("ul.select2-results li.select2-result-selectable")
-                results.first.wait_for(state="visible")
-
-                while True:
-                    if results.count() == 1:
-                        results.first.click()
-                        break
-                    else:
-                        page.wait_for_timeout(max(10, timeout // 100))
-                        continue
+        :param cookies: the cookies as dicts of name, value, domain and path
+        :return: None
+        """
+
+        for cookie in cookies:
+            self.session.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"])
+
+    def _swap_token(self, headers: Dict, params: Dict, session: Optional[requests.Session] = None) -> None:
+        """
+        swap in the refreshed headers & params as a whole
+
+        :param headers: the refreshed headers
+        :param params:  the refreshed params
+        :param session: the session the token belongs to, None to keep the current one
+        :return: None
+        """
+
+        with self._token_lock:
+            if session is not None:
+                self.session = session
+            self.headers = headers
+            self.params = params
+            self._token_version += 1
+            self._token_acquired_at = time.monotonic()
+
+    def _refresh_over_browser(self, course_field: str, course_num: int | str, timeout: int, deadline: Optional[float] = None) -> None:
+        """
+        refresh the token by driving the whole Banner UI and capturing the searchResults request it sends
+
+        :param course_field:    The full name of the course field (e.g. Computer Science is the course_field of CS)
+        :param course_num:      The number of the course (e.g. 498 is the course number for CS498)
+        :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param deadline:        the time.monotonic() by which the refresh has to be done, None for no deadline
+        :return: None
+        """
+
+        headers, params = self._capture_token_over_browser(course_field, course_num, timeout, deadline)
+        self._swap_token(headers, params)
+
+    def _capture_token_over_browser(
+        self,
+        course_field: str,
+        course_num: int | str,
+        timeout: int,
+        deadline: Optional[float] = None
+    ) -> tuple[Dict, Dict]:
+        """
+        drive the whole Banner UI and take the headers & params of the searchResults request it sends
+
+        :param course_field:    The full name of the course field (e.g. Computer Science is the course_field of CS)
+        :param course_num:      The number of the course (e.g. 498 is the course number for CS498)
+        :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param deadline:        the time.monotonic() by which the refresh has to be done, None for no deadline
+        :return: the captured headers & params
+        """
+
+        # 0) open a page on the persistent browser
+        self.rate_limiter.acquire(self.refresh_prefix)
+        page = self._open_page(timeout)
+        healthy = False
+
+        try:
+            # 1) open register page & 2) the login page, skipped if the kept context is still logged in
+            self._enter_registration(page, timeout, deadline)
+
+            self._select_term(page)
+            req = self._capture_search_request(page, course_field, course_num, timeout, deadline)
+
+            # 9) take the header & params of the refreshed request
+            headers = self._filter_headers(req.all_headers())
+            params = self._params_from_url(req.url, self.params)
+            self._save_storage_state()
+            healthy = True
+
+        finally:
+            self._release_page(page, healthy)
+
+        return headers, params
+
+    def _enter_registration(self, page, timeout: int, deadline: Optional[float] = None) -> None:
+        """
+        open the register page and log in (with DUO) unless the context is still logged in
+
+        :param page:        the page opened by _open_page
+        :param timeout:     The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param deadline:    the time.monotonic() by which the refresh has to be done, None for no deadline
+        :return: None
+        """
+
+        # 1) open register page
+        page.goto(self.refresh_prefix, wait_until="domcontentloaded")
+
+        # 2) open the login page, skipped if the kept context is still logged in
+        page.locator("#registerLink").click()
+        if self._needs_login(page):
+            if self._context_from_state:
+                self.logger.info(message="Saved storage state is rejected, falling back to full login", role="refresh")
+            self._login(page, timeout, deadline)
+        else:
+            self.logger.debug(message="Context is still logged in, skipping login", role="refresh")
+
+    def _sign_in(self, timeout: int, session: Optional[requests.Session] = None, deadline: Optional[float] = None) -> None:
+        """
+        use the browser only for the SSO/DUO step, then hand its cookies over to the pooled session
+
+        :param timeout:     The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param session:     the session receiving the cookies, defaults to the current one
+        :param deadline:    the time.monotonic() by which the refresh has to be done, None for no deadline
+        :return: None
+        """
+
+        session = session if session is not None else self.session
+
+        self.rate_limiter.acquire(self.refresh_prefix)
+        page = self._open_page(timeout)
+        healthy = False
+
+        try:
+            self._enter_registration(page, timeout, deadline)
+            page.locator("#s2id_txt_term").wait_for(state="visible")
+
+            for cookie in self._context.cookies():
+                session.cookies.set(
+                    cookie["name"], cookie["value"],
+                    domain=cookie["domain"], path=cookie["path"]
+                )
+            self._save_storage_state()
+            healthy = True
+
+        finally:
+            self._release_page(page, healthy)
+
+    def _prime_search_session(self, session: Optional[requests.Session] = None) -> tuple[Dict, Dict]:
+        """
+        replay the term selection and search priming calls of the Banner UI over the pooled session
+
+        :param session: the session to prime, defaults to the current one
+        :return: the headers & params for the following searchResults requests
+        """
+
+        session = session if session is not None else self.session
 
-                page.locator("#txt_courseNumber").fill(str(course_num))
-                page.locator("#txt_courseNumber").press("Enter")
-            req = req_info.value
+        headers = {
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "X-Requested-With": "XMLHttpRequest",
+        }
+        unique_session_id = self._new_unique_session_id()
+        deadline = self._deadline(self.fetch_deadline)
 
-            # 9) update the header & params for the refreshed request
-            self._update_headers_from_request(req)
-            self._update_params_from_request(req)
+        # 1) list the terms, the first one is what the UI selects
+        response = self._request(
+            "getTerms", session, "GET", f"{self.ssb_prefix}/classSearch/getTerms", deadline,
+            params={"searchTerm": "", "offset": 1, "max": 10},
+            headers=headers,
+            allow_redirects=False
+        )
+        if response.status_code != 200:
+            raise ValueError(f"session cookie is rejected, state: {response.status_code}")
+        term = response.json()[0]["code"]
 
-            context.close()
-            browser.close()
+        # 2) select the term for this uniqueSessionId
+        response = self._request(
+            "term/search", session, "POST", f"{self.ssb_prefix}/term/search", deadline,
+            params={"mode": "search"},
+            data={
+                "term": term,
+                "studyPath": "",
+                "studyPathText": "",
+                "startDatepicker": "",
+                "endDatepicker": "",
+                "uniqueSessionId": unique_session_id,
+            },
+            headers=headers,
+            allow_redirects=False
+        )
+        if response.status_code != 200:
+            raise ValueError(f"failed to select term {term}, state: {response.status_code}")
 
-            self.logger.info(message="Token successfully refreshed", role="refresh")
+        # 3) reset the search form, as the UI does before every search
+        self._request(
+            "resetDataForm", session, "POST", f"{self.ssb_prefix}/classSearch/resetDataForm", deadline,
+            headers=headers,
+            allow_redirects=False
+        )
+
+        return headers, {"txt_term": term, "uniqueSessionId": unique_session_id}
+
+    def _refresh_over_http(self, course_field: str, course_num: int | str, timeout: int, deadline: Optional[float] = None) -> None:
+        """
+        refresh the token over the pooled session, signing in through the browser only if the session cookie is rejected,
+        and falling back to the browser refresh for good if the replayed priming does not work on this Banner
+
+        :param course_field:    The full name of the course field (e.g. Computer Science is the course_field of CS)
+        :param course_num:      The number of the course (e.g. 498 is the course number for CS498)
+        :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param deadline:        the time.monotonic() by which the refresh has to be done, None for no deadline
+        :return: None
+        """
+
+        session = self.session
+        try:
+            headers, params = self._prime_search_session(session)
+        except NetworkError:
+            # an unreachable Banner is not fixed by signing in again
+            raise
+        except Exception as e:
+            self.logger.debug(message=f"Priming over http failed due to {str(e)}, signing in through the browser", role="refresh")
+            self._sign_in(timeout, session, deadline)
+            try:
+                headers, params = self._prime_search_session(session)
+            except NetworkError:
+                raise
+            except Exception as e:
+                # freshly signed in and still rejected, the replayed calls do not fit this Banner
+                self.logger.warning(message=f"Priming over http failed after signing in due to {str(e)}, switching to the browser refresh mode", role="refresh")
+                self.refresh_mode = "browser"
+                self._refresh_over_browser(course_field, course_num, timeout, deadline)
+                return
+
+        self._swap_token(headers, params, session)
+
+    def _warm_standby(self, standby: Optional[StandbySession]) -> StandbySession:
+        """
+        authenticate a standby session with its own uniqueSessionId, always running on the refresh thread
+
+        :param standby: the standby to re-authenticate, None to build a new one
+        :return: the warmed standby
+        """
+
+        self._guard_upstream()
+        session = standby.session if standby is not None else self._build_session(**self._session_options)
+        course_field, course_num, timeout = self._refresh_target or (None, None, 10*1000)
+        deadline = self._deadline(self.refresh_deadline)
+
+        if self.refresh_mode == "http":
+            session.cookies.update(self.session.cookies)
+            try:
+                headers, params = self._prime_search_session(session)
+            except NetworkError:
+                # an unreachable Banner is not fixed by signing in again
+                raise
+            except Exception as e:
+                self.logger.debug(message=f"Priming a standby failed due to {str(e)}, signing in through the browser", role="standby")
+                self._sign_in(timeout, session, deadline)
+                headers, params = self._prime_search_session(session)
+        else:
+            if course_field is None:
+                raise ValueError("no course searched yet to capture a standby token from")
+            headers, params = self._capture_token_over_browser(course_field, course_num, timeout, deadline)
+
+        return StandbySession(session, headers, params)
+
+    def _check_standby(self, spare: StandbySession) -> bool:
+        """
+        check with the cheapest authenticated request that a standby still holds a live session before rotating to it
+
+        :param spare: the standby to check
+        :return: True if Banner accepts its session
+        """
+
+        try:
+            response = self._request(
+                "standby check", spare.session, "GET", f"{self.ssb_prefix}/classSearch/getTerms",
+                self._deadline(self.fetch_deadline),
+                params={"searchTerm": "", "offset": 1, "max": 1},
+                headers=spare.headers,
+                allow_redirects=False
+            )
+        except Exception as e:
+            self.logger.debug(message=f"Checking a standby failed due to {str(e)}", role="standby")
+            return False
+        return response.status_code == 200
+
+    def _failover(self) -> bool:
+        """
+        rotate to a ready standby session once it passes a check, handing the failed one back to the pool to be re-authenticated
+
+        :return: False if no standby is ready or the one taken is dead
+        """
+
+        if self.standby is None or (spare := self.standby.take()) is None:
+            return False
+
+        # the standbys share the cookies of the active session, so whatever killed it may have killed them too
+        if not self._check_standby(spare):
+            spare.session.close()
+            self.standby.clear()
+            self.logger.info(message="The standby session is dead as well, dropping the ready standbys", role="standby")
+            return False
+
+        with self._token_lock:
+            failed = StandbySession(self.session, self.headers, self.params)
+            self.session = spare.session
+            self.headers = spare.headers
+            self.params = spare.params
+            self._token_version += 1
+            self._token_acquired_at = spare.acquired_at
+
+        self.standby.retire(failed)
+        self.logger.info(message=f"Rotated to a standby session, {len(self.standby)} left ready", role="standby")
+        return True
 
     def watch(
         self,
@@ -211,7 +1036,12 @@ class SnowCat:
         course_ids: Optional[int | str | list[int | str] | tuple[int | str, ...] | set[int | str]] = None,
         on_trigger: Optional[Callable] = None,
         interval: int = 15,
-        timeout: int = 10*1000
+        timeout: int = 10*1000,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        deadlines: Optional[List[datetime]] = None,
+        registrar: Optional[AutoRegistrar] = None,
+        retry_policy: Callable[[], RetryPolicy] = RetryPolicy
     ) -> None:
         """
         The main method for watching the course availability + trigger specific actions when there is availability
@@ -223,50 +1053,192 @@ class SnowCat:
         :param on_trigger:      The function to call per success fetching
         :param interval:        The waiting time for a second course-availability-inquiry is initiated (in seconds)
         :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param min_interval:    The shortest interval the polling tightens to while seats churn (in seconds), defaults to interval
+        :param max_interval:    The longest interval the polling relaxes to while the course is quiet (in seconds), defaults to interval
+        :param deadlines:       The add/drop deadlines, the polling runs at min_interval shortly before each of them
+        :param registrar:       The auto-registrar adding its CRNs as soon as they open, None to only alert
+        :param retry_policy:    The factory of the failure state machine of every course, never giving up by default
         :return: None
         """
 
-        if on_trigger is None:
-            def _(candidate_list, logger=self.logger):
-                info_dict = {}
-                alarm = False
+        self.watch_many(
+            courses=[{
+                "course_field": course_field,
+                "course_abb": course_abb,
+                "course_num": course_num,
+                "course_ids": course_ids,
+            }],
+            on_trigger=on_trigger,
+            interval=interval,
+            timeout=timeout,
+            min_interval=min_interval,
+            max_interval=max_interval,
+            deadlines=deadlines,
+            registrar=registrar,
+            retry_policy=retry_policy
+        )
 
-                for candidate in candidate_list:
-                    info_dict[candidate["courseReferenceNumber"]] = candidate['seatsAvailable']
-                    if candidate["seatsAvailable"] > 0:
-                        alarm = True
+    def watch_many(
+        self,
+        courses: List[Dict],
+        on_trigger: Optional[Callable] = None,
+        interval: int = 15,
+        timeout: int = 10*1000,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        budget: Optional[float] = None,
+        deadlines: Optional[List[datetime]] = None,
+        dispatcher: Optional[TriggerDispatcher] = None,
+        registrar: Optional[AutoRegistrar] = None,
+        retry_policy: Callable[[], RetryPolicy] = RetryPolicy
+    ) -> None:
+        """
+        Watch several courses in one loop, sharing the pooled session and the refreshed token across all of them
 
-                if alarm:
-                    logger.warning(role="SnowCat", message=f"Course {str(course_abb) + str(course_num)} available with spots: {info_dict}!")
-                    for _ in range(5):
-                        winsound.MessageBeep()
-                        time.sleep(1.5)
-                else:
-                    logger.debug(role="SnowCat",message=f"Course {str(course_abb) + str(course_num)} available with spots: {info_dict}!")
+        :param courses:         The course specs, each a dict with course_field, course_abb, course_num and optionally course_ids / on_trigger
+        :param on_trigger:      The function to call per success fetching, for specs that do not carry their own on_trigger
+        :param interval:        The starting waiting time for a second course-availability-inquiry of a course (in seconds)
+        :param timeout:         The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param min_interval:    The shortest interval a course tightens to while its seats churn (in seconds), defaults to interval
+        :param max_interval:    The longest interval a course relaxes to while it is quiet (in seconds), defaults to interval
+        :param budget:          The request budget of all courses together (in requests per minute), None for unbounded
+        :param deadlines:       The add/drop deadlines, every course polls at min_interval shortly before each of them
+        :param dispatcher:      The worker pool the triggers run on, so polling goes on while they alert, defaults to a TriggerDispatcher of 4 workers
+        :param registrar:       The auto-registrar adding its CRNs as soon as they open, None to only alert
+        :param retry_policy:    The factory of the failure state machine of every course, never giving up by default
+        :return: None
+        """
+
+        specs = []
+        for course in courses:
+            spec = dict(course)
+            spec["course_ids"] = self._normalize_course_ids(spec.get("course_ids"))
+            if spec.get("on_trigger") is None:
+                spec["on_trigger"] = on_trigger or self._default_trigger(spec["course_abb"], spec["course_num"])
+            specs.append(spec)
+
+        scheduler = AdaptiveScheduler(
+            interval=interval,
+            min_interval=min_interval,
+            max_interval=max_interval,
+            budget=budget,
+            deadlines=deadlines
+        )
+        for index in range(len(specs)):
+            scheduler.add(index)
+
+        if dispatcher is None:
+            dispatcher = TriggerDispatcher(logger=self.logger)
+
+        self._start_proactive_refresh()
+
+        try:
+            self._watch_loop(specs, scheduler, dispatcher, timeout, registrar, retry_policy)
+        finally:
+            # let the alerts already queued finish
+            dispatcher.shutdown(wait=True)
+
+    def _watch_loop(
+        self,
+        specs: List[Dict],
+        scheduler: AdaptiveScheduler,
+        dispatcher: TriggerDispatcher,
+        timeout: int,
+        registrar: Optional[AutoRegistrar] = None,
+        retry_policy: Callable[[], RetryPolicy] = RetryPolicy
+    ) -> None:
+        """
+        poll whichever course is due next, until the failover gives up
 
-            on_trigger = _
+        :param specs:       The normalized course specs
+        :param scheduler:   The scheduler of the courses, keyed by their index in specs
+        :param dispatcher:  The worker pool the triggers run on
+        :param timeout:     The time to wait for dom-wise-event to be noticed (in milliseconds)
+        :param registrar:   The auto-registrar, fired on the polling thread before any trigger is dispatched
+        :param retry_policy: The factory of the failure state machine of every course
+        :return: None
+        """
+
+        # one policy per course, so a failing course neither backs off nor gives up the others
+        policies = [retry_policy() for _ in specs]
+        watching = len(specs)
 
         while True:
-            try:
-                response_list = self.fetch(course_abb, course_num, course_ids)
-                self.was_failed = False
+            index, wait = scheduler.next_due()
+            if wait > 0:
+                time.sleep(wait)
+            dispatcher.reap()
+            spec = specs[index]
+            policy = policies[index]
+            course_name = str(spec["course_abb"]) + str(spec["course_num"])
 
-            except Exception as e:
-                if self.was_failed:
-                    self.logger.error(role="SnowCat", message=f"Exit due to {str(e)}")
-                    winsound.MessageBeep()
-                    return
-                else:
-                    self.logger.error(role="SnowCat", message=f"Failed due to {str(e)}, retrying for failover!")
-                    winsound.MessageBeep()
+            changed = None
+            while True:
+                token_version = self._token_version
+                try:
+                    response_list = self.fetch(spec["course_abb"], spec["course_num"], spec["course_ids"])
+                    self.was_failed = False
+                    if failures := policy.success():
+                        self.logger.info(role="SnowCat", message=f"{course_name} recovered after {failures} failed fetches")
+
+                except Exception as e:
                     self.was_failed = True
-                    self.refresh(course_field, course_num, timeout=timeout)
+                    decision = policy.failure(e)
+                    if decision.give_up:
+                        watching -= 1
+                        if not watching:
+                            self.logger.error(role="SnowCat", message=f"Exit after {policy.failures} failures in a row, the last due to {str(e)}")
+                            self._notify("SnowCat exited", str(e))
+                            return
+                        # the course is not rescheduled, the others go on
+                        self.logger.error(role="SnowCat", message=f"Stop watching {course_name} after {policy.failures} failures in a row, the last due to {str(e)}")
+                        self._notify(f"SnowCat stopped watching {course_name}", str(e))
+                        break
+
+                    self.logger.error(role="SnowCat", message=f"{course_name} failed ({decision.kind} #{decision.attempt}) due to {str(e)}, retrying in {decision.delay:.1f}s")
+                    if decision.alert:
+                        self._notify(f"SnowCat failing on {course_name} ({decision.kind})", f"{policy.failures} failures in a row: {str(e)}")
+
+                    # the other failures back off on the schedule, so the other courses are polled meanwhile
+                    if not decision.refresh:
+                        scheduler.schedule(index, decision.delay)
+                        break
+
+                    # only an expired session is worth a refresh, retried in place since every course needs the token
+                    if decision.attempt == 1:
+                        self._observe_expiry()
+                    if self._failover():
+                        continue
+                    time.sleep(decision.delay)
+                    try:
+                        self.refresh(spec["course_field"], spec["course_num"], timeout=timeout, token_version=token_version)
+                    except Exception as refresh_error:
+                        self.logger.error(role="SnowCat", message=f"Refresh failed due to {str(refresh_error)}")
                     continue
 
-            else:
-                on_trigger(response_list, self.logger)
+                else:
+                    detected_at = time.perf_counter()
+                    changed = getattr(response_list, "changed", True)
+                    if changed:
+                        if registrar is not None:
+                            registrar.check(response_list, detected_at)
+                        dispatcher.submit(spec["on_trigger"], response_list, self.logger, key=index)
+                    break
+
+            # the failed course is already rescheduled, or dropped
+            if changed is None:
+                continue
+
+            # re-arm off the detection path, so an opening only costs the pre-built request
+            if registrar is not None:
+                registrar.ensure_armed()
+            if self.standby is not None:
+                self.standby.fill()
 
-            time.sleep(interval)
+            # the first poll of a course always reads as changed, it is no churn
+            churned = changed and spec.get("polled", False)
+            spec["polled"] = True
+            scheduler.schedule(index, scheduler.record(index, churned))
 
 
 if __name__ == "__main__":
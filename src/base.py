@@ -0,0 +1,781 @@
+import os
+import json
+import time
+import random
+import string
+import hashlib
+import importlib
+import statistics
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from pathlib import Path
+from dotenv import load_dotenv
+from typing import List, Dict, Optional, Callable
+from urllib.parse import urlparse, parse_qs
+
+from logger import Logger
+from differ import SeatDiffer, SeatEvent
+from section import Section
+from ratelimit import RateLimiter
+from notifier import Notifier, BatchingNotifier, get_notifier
+from errors import DeadlineError, DecodeError, AuthError, raise_for_status
+from breaker import CircuitBreaker
+from timing import AttemptLog
+from hedge import Hedger
+from tokencache import TokenCache
+
+
+def load_json_decoder(backend: str = 'auto') -> Callable[[bytes], object]:
+    """
+    Load the json decoder of the given backend, imported lazily since the fast ones are optional dependencies
+
+    :param backend: 'orjson', 'ujson' or 'json', 'auto' picks the fastest one installed
+    :return: the decoding function taking the raw body
+    """
+
+    for name in (("orjson", "ujson") if backend == "auto" else (backend,)):
+        if name == "json":
+            break
+        try:
+            return importlib.import_module(name).loads
+        except ImportError:
+            if backend != "auto":
+                raise
+    return json.loads
+
+
+class PollResult(list):
+    def __init__(self, candidates: List[Dict] = (), changed: bool = True) -> None:
+        """
+        The sections returned by a fetch, flagged whether the searchResults changed since the last poll of the same query
+
+        :param candidates:  the course config information
+        :param changed:     False if every response of this poll was unchanged (304 or same body) since the last poll
+        """
+
+        super().__init__(candidates)
+        self.changed = changed
+
+
+class BaseSnowCat(ABC):
+    # chromium flags trimming the background work a headless refresh never needs
+    LEAN_CHROMIUM_ARGS = [
+        "--disable-gpu",
+        "--disable-dev-shm-usage",
+        "--disable-extensions",
+        "--disable-background-networking",
+        "--disable-component-update",
+        "--disable-default-apps",
+        "--disable-sync",
+        "--no-first-run",
+        "--mute-audio",
+    ]
+
+    # analytics hosts of the Banner and SSO pages, never needed to capture the token
+    BLOCKED_HOSTS = (
+        "google-analytics.com",
+        "googletagmanager.com",
+        "doubleclick.net",
+        "hotjar.com",
+    )
+
+    # the section fields a watcher needs, a handy projection for the fields option
+    WATCH_FIELDS = (
+        "courseReferenceNumber",
+        "subject",
+        "courseNumber",
+        "sequenceNumber",
+        "courseTitle",
+        "seatsAvailable",
+        "waitAvailable",
+        "waitCount",
+        "waitCapacity",
+        "enrollment",
+        "maximumEnrollment",
+    )
+
+    # the searchResults filter narrowing a search to one CRN, probed at runtime since not every Banner honours it
+    CRN_QUERY_KEY = "txt_crn"
+    NARROW_PAGE_SIZE = 10
+
+    # the requests retried within the deadline: idempotent ones failing to connect or answered by a gateway error
+    RETRY_METHODS = ("GET", "HEAD")
+    RETRY_STATUSES = (502, 503, 504)
+    RETRY_BACKOFF = 0.5
+
+    def __init__(
+        self,
+        level: str = 'INFO',
+        config_path: os.PathLike | str = Path.cwd() / Path("../configs/.env.user_config"),
+        keep_context: bool = True,
+        storage_state_path: Optional[os.PathLike | str] = Path.cwd() / Path("../configs/.storage_state.json"),
+        proactive_refresh: bool = True,
+        refresh_margin: float = 0.8,
+        refresh_mode: str = 'http',
+        block_resources: Optional[tuple[str, ...]] = ("image", "font", "media"),
+        viewport: Optional[Dict] = None,
+        page_size: int = 500,
+        json_backend: str = 'auto',
+        fields: Optional[tuple[str, ...]] = None,
+        records: bool = False,
+        rate_limiter: Optional[RateLimiter] = None,
+        notifier: Optional[Notifier | str] = 'auto',
+        notify_window: float = 1.0,
+        breaker: Optional[CircuitBreaker] = None,
+        connect_timeout: float = 5,
+        read_timeout: float = 15,
+        max_retries: int = 3,
+        fetch_deadline: Optional[float] = 30,
+        refresh_deadline: Optional[float] = 300,
+        hedge_percentile: Optional[float] = None,
+        hedge_max_rate: float = 0.1,
+        token_cache: Optional[TokenCache] = None
+    ) -> None:
+        """
+        The state and the transport-free helpers shared by SnowCat and AsyncSnowCat: query building, payload parsing,
+        token bookkeeping and the circuit breaker, see SnowCat for the parameters
+        """
+
+        # init request config
+        self.ssb_prefix = "https://banner.apps.uillinois.edu/StudentRegistrationSSB/ssb"
+        self.prefix = "https://banner.apps.uillinois.edu/StudentRegistrationSSB/ssb/searchResults/searchResults"
+        self.refresh_prefix = "https://banner.apps.uillinois.edu/StudentRegistrationSSB/ssb/registration?mepCode=1UIUC#"
+        self.params = {}
+        self.headers = {}
+        self.page_size = page_size
+        self._crn_query_supported = None
+
+        # init conditional polling cache, keyed by the query without the session id
+        self._poll_cache = {}
+
+        # init payload decoding & field projection
+        self._decode = load_json_decoder(json_backend)
+        # the CRN is always kept, the filtering by course_ids, the differ and full_section all key on it
+        self.fields = tuple(dict.fromkeys(("courseReferenceNumber", *fields))) if fields is not None else None
+        self.records = records
+        self._crn_index = {}
+
+        # init shared rate limiter
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter.shared()
+
+        # init request deadlines & the timing of every attempt
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.fetch_deadline = fetch_deadline
+        self.refresh_deadline = refresh_deadline
+        self.attempts = AttemptLog()
+
+        # init hedging of the slow searchResults requests, the latency percentile is learned from the attempts
+        self.hedger = Hedger(self.attempts, percentile=hedge_percentile, max_rate=hedge_max_rate) if hedge_percentile is not None else None
+
+        # init circuit breaker, so an outage costs one probe per reset timeout instead of a browser launch per failure
+        self.breaker = breaker if breaker is not None else CircuitBreaker.shared()
+
+        # init user config
+        load_dotenv(config_path)
+        self.username = os.getenv("UIUC_USERNAME")
+        self.password = os.getenv("UIUC_PASSWORD")
+
+        # init fetching status
+        self.was_failed = False
+
+        # init persistent browser, launched lazily by the first refresh
+        self.keep_context = keep_context
+        self._playwright = None
+        self._browser = None
+        self._context = None
+
+        # init persisted storage state, so refresh can skip the login & DUO
+        self.storage_state_path = Path(storage_state_path) if storage_state_path is not None else None
+        self._context_from_state = False
+
+        # init token bookkeeping, the token (headers + params) is only ever swapped as a whole under the lock
+        self._token_lock = threading.Lock()
+        self._token_version = 0
+        self._token_acquired_at = None
+        self._token_lifetimes = deque(maxlen=16)
+        self._refresh_target = None
+
+        # init shared token cache, keyed by the NetID
+        self.token_cache = token_cache
+        self._cache_key = self.username or "default"
+        self._cached_token_id = None
+
+        # init refresh mode
+        if refresh_mode not in ("http", "browser"):
+            raise ValueError(f"unknown refresh_mode: {refresh_mode}")
+        self.refresh_mode = refresh_mode
+
+        # init lean refresh browser profile
+        self.block_resources = frozenset(block_resources or ())
+        self.viewport = viewport or {"width": 1024, "height": 768}
+
+        # init background refresh
+        self.proactive_refresh = proactive_refresh
+        self.refresh_margin = refresh_margin
+
+        # init sync logger
+        self.logger = Logger(level=level)
+
+        # init notifier, delivered on its own thread so alerts never block the polling
+        if isinstance(notifier, str):
+            notifier = get_notifier(notifier)
+        self.notifier = BatchingNotifier(notifier, logger=self.logger, window=notify_window) if notifier is not None else None
+
+    def _notify(self, title: str, message: str) -> None:
+        """
+        queue a notification, if a notifier is configured
+
+        :param title:   the title of the notification
+        :param message: the body of the notification
+        :return: None
+        """
+
+        if self.notifier is not None:
+            self.notifier.notify(title, message)
+
+    @staticmethod
+    def _deadline(seconds: Optional[float]) -> Optional[float]:
+        """
+        turn a deadline budget into the time.monotonic() it runs out at
+
+        :param seconds: the budget, None for no deadline
+        :return: the deadline, None for no deadline
+        """
+
+        return time.monotonic() + seconds if seconds is not None else None
+
+    def _request_timeout(self, deadline: Optional[float]) -> tuple[float, float]:
+        """
+        the (connect, read) timeouts of a request, cut to whatever is left of the deadline
+
+        :param deadline: the time.monotonic() by which the call has to be done, None for no deadline
+        :return: the timeouts (in seconds)
+        """
+
+        if deadline is None:
+            return self.connect_timeout, self.read_timeout
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise DeadlineError("deadline exceeded before the request was sent")
+        return min(self.connect_timeout, left), min(self.read_timeout, left)
+
+    def _retry_delay(self, retry: int, deadline: Optional[float]) -> Optional[float]:
+        """
+        the exponential backoff before the next try of a request, as long as it leaves time to send it before the deadline
+
+        :param retry:       the retries already made
+        :param deadline:    the time.monotonic() by which the call has to be done, None for no deadline
+        :return: the backoff (in seconds), None once the retries or the deadline are used up
+        """
+
+        if retry >= self.max_retries:
+            return None
+        delay = self.RETRY_BACKOFF * 2 ** retry
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+    def _record_upstream(self, status_code: Optional[int]) -> None:
+        """
+        feed the outcome of a request to the circuit breaker, only an unreachable or 5xx Banner counts as down
+
+        :param status_code: the status code of the response, None if Banner was not reached
+        :return: None
+        """
+
+        if status_code is not None and status_code < 500:
+            self.breaker.record_success()
+        elif self.breaker.record_failure():
+            retry_in = self.breaker.retry_in()
+            self.logger.error(role="breaker", message=f"Banner looks down, opening the circuit for {retry_in:.0f}s")
+            self._notify("Banner is down", f"polling and refreshing paused, next probe in {retry_in:.0f}s")
+
+    @staticmethod
+    def _poll_key(params: Dict) -> tuple:
+        """
+        key a query for the conditional polling cache, the session id is left out since it does not change the result
+
+        :param params: the query params
+        :return: the cache key
+        """
+
+        return tuple(sorted((key, str(value)) for key, value in params.items() if key != "uniqueSessionId"))
+
+    def _conditional_headers(self, key: tuple, headers: Dict) -> Dict:
+        """
+        add the validators Banner returned for the last poll of the same query, if any
+
+        :param key:     the cache key of the query
+        :param headers: the refreshed headers
+        :return: the headers of the conditional request
+        """
+
+        cached = self._poll_cache.get(key)
+        if cached is None or not (cached["etag"] or cached["last_modified"]):
+            return headers
+
+        headers = dict(headers)
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
+
+    def _resolve_poll(self, key: tuple, status_code: int, response_headers, content: bytes) -> tuple[Dict, bool]:
+        """
+        reuse the last decoded body if the response is not modified or has the same content hash, decode it otherwise
+
+        :param key:                 the cache key of the query
+        :param status_code:         the status code of the response
+        :param response_headers:    the headers of the response
+        :param content:             the raw body of the response
+        :return: the decoded json body, and whether it changed since the last poll of the same query
+        """
+
+        cached = self._poll_cache.get(key)
+        if status_code == 304 and cached is not None:
+            return cached["response"], False
+        raise_for_status(status_code, response_headers)
+
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        if cached is not None and cached["digest"] == digest:
+            return cached["response"], False
+
+        try:
+            decoded = self._decode(content)
+        except Exception as e:
+            # an expired session gets the login page instead of the json
+            if content.lstrip()[:1] == b"<":
+                raise AuthError("session expired, got an html page") from e
+            raise DecodeError(f"failed to decode searchResults: {e}") from e
+        response = self._project(key, decoded)
+        self._poll_cache[key] = {
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "digest": digest,
+            "response": response,
+            "content": content if (self.records or self.fields is not None) else None,
+        }
+        return response, True
+
+    def _project(self, key: tuple, response: Dict) -> Dict:
+        """
+        turn every section into a Section record (or keep only the watched fields of it), and index which query each CRN came from
+
+        :param key:         the cache key of the query
+        :param response:    the decoded json body of the searchResults request
+        :return: the projected json body
+        """
+
+        if not isinstance(response, dict) or not isinstance(response.get("data"), list):
+            return response
+        if not self.records and self.fields is None:
+            return response
+
+        fields = self.fields
+        candidate_list = []
+        for candidate in response["data"]:
+            if self.records:
+                candidate_list.append(Section.from_dict(candidate, extra_fields=fields, loader=self.full_section))
+            else:
+                candidate_list.append({field: candidate[field] for field in fields if field in candidate})
+            self._crn_index[candidate["courseReferenceNumber"]] = key
+        return dict(response, data=candidate_list)
+
+    def full_section(self, crn: int | str) -> Optional[Dict]:
+        """
+        Decode the full section of a CRN from the last raw payload it was seen in, for the fields dropped by projection
+
+        :param crn: the course reference number of the section
+        :return: the full section, None if the CRN was not seen yet
+        """
+
+        crn = str(crn)
+        cached = self._poll_cache.get(self._crn_index.get(crn))
+        if cached is None or cached["content"] is None:
+            return None
+
+        # decoded once per poll, however many fields of however many sections are read from it
+        sections = cached.get("sections")
+        if sections is None:
+            sections = {candidate["courseReferenceNumber"]: candidate for candidate in self._decode(cached["content"]).get("data") or ()}
+            cached["sections"] = sections
+        return sections.get(crn)
+
+    def _narrow_crn(
+        self,
+        course_ids: Optional[int | str | list[int | str] | tuple[int | str, ...] | set[int | str] | frozenset[str]]
+    ) -> Optional[str]:
+        """
+        tell which CRN a narrow query can be issued for, a narrow query only covers a single CRN
+
+        :param course_ids: All course IDs that you are interested in
+        :return: the CRN, None if the full section list has to be fetched
+        """
+
+        if course_ids is None or self._crn_query_supported is False:
+            return None
+        if isinstance(course_ids, (list, tuple, set, frozenset)):
+            if len(course_ids) != 1:
+                return None
+            course_ids = next(iter(course_ids))
+        return str(course_ids)
+
+    def _narrow_query(self, params: Dict, crn: str) -> Dict:
+        """
+        narrow the query params of a searchResults request down to one CRN
+
+        :param params:  the query params of the full section list
+        :param crn:     the CRN to narrow down to
+        :return: the narrowed query params
+        """
+
+        params = dict(params)
+        params[self.CRN_QUERY_KEY] = crn
+        params["pageMaxSize"] = self.NARROW_PAGE_SIZE
+        return params
+
+    def _check_narrow(self, response: Dict, crn: str) -> bool:
+        """
+        check whether Banner honoured the narrow query, and remember it when it did not
+
+        :param response:    the decoded json body of the narrowed searchResults request
+        :param crn:         the CRN the query was narrowed to
+        :return: True if the response can be used as is, False if the full section list has to be fetched
+        """
+
+        candidate_list = response.get("data") if isinstance(response, dict) else None
+        if not isinstance(candidate_list, list):
+            # not a search result at all, let _parse_candidates report it
+            return True
+
+        if any(candidate["courseReferenceNumber"] != crn for candidate in candidate_list):
+            self._crn_query_supported = False
+            self.logger.info(message="narrow CRN query is unsupported, falling back to full section lists", role="fetch")
+            return False
+
+        if candidate_list:
+            self._crn_query_supported = True
+        return True
+
+    @staticmethod
+    def _next_page_offset(response: Dict) -> Optional[int]:
+        """
+        tell the page offset of the sections not listed yet
+
+        :param response: the decoded json body of the searchResults request, with the pages so far merged in
+        :return: the next page offset, None if every section is listed
+        """
+
+        if not isinstance(response, dict):
+            return None
+        candidate_list = response.get("data")
+        total_count = response.get("totalCount")
+        if isinstance(candidate_list, list) and isinstance(total_count, int) and len(candidate_list) < total_count:
+            return len(candidate_list)
+        return None
+
+    def _build_query(self, course_abb: str, course_num: int | str) -> Dict:
+        """
+        build the query params of a searchResults request on top of the refreshed params
+
+        :param course_abb: The abbreviation of the course (e.g. CS for Computer Science)
+        :param course_num: The number of the course (e.g. 498 is the course number for CS498)
+        :return: the query params
+        """
+
+        params = dict(self.params)
+        params["txt_subject"] = course_abb
+        params["txt_courseNumber"] = course_num
+        params["pageOffset"] = 0
+        params["pageMaxSize"] = self.page_size
+        return params
+
+    def _parse_candidates(
+        self,
+        response: Dict,
+        course_ids: Optional[int | str | list[int | str] | tuple[int | str, ...] | set[int | str] | frozenset[str]] = None
+    ) -> List[Dict]:
+        """
+        validate the decoded searchResults response and keep the candidates of the interested course ids
+
+        :param response:   the decoded json body of the searchResults request
+        :param course_ids: All course IDs that you are interested in
+        :return: A list of course config information, including the seat availability
+        """
+
+        if not isinstance(response, dict):
+            raise DecodeError(f"unexpected searchResults payload: {type(response).__name__}")
+        if response.get("data") is None:
+            # Banner answers an unprimed or expired uniqueSessionId with an empty payload
+            raise AuthError(f"search session expired, state: {response.get('success')}")
+
+        try:
+            candidate_list = response["data"]
+            if self.was_failed:
+                self.logger.info(message="link reinitiated successfully", role="fetch")
+
+            if course_ids is None:
+                if "success" in response:
+                    return candidate_list
+                else:
+                    self.logger.error(message=f"failed to initiate link", role="fetch")
+                    raise DecodeError(f"failed to fetch, state: {response['success']}")
+            else:
+                course_ids = self._normalize_course_ids(course_ids)
+                ret_list = [
+                    candidate for candidate in candidate_list
+                    if candidate["courseReferenceNumber"] in course_ids
+                ]
+                return ret_list
+
+        except Exception as e:
+            self.logger.error(message=f"failed to initiate link: {e}", role="fetch")
+            raise DecodeError(f"failed to fetch: {e}, state: {response.get('success')}")
+
+    @staticmethod
+    def _normalize_course_ids(
+        course_ids: Optional[int | str | list[int | str] | tuple[int | str, ...] | set[int | str] | frozenset[str]]
+    ) -> Optional[frozenset[str]]:
+        """
+        normalize the interested course ids into a frozen set of CRN strings, already normalized ones are returned as is
+
+        :param course_ids: All course IDs that you are interested in
+        :return: the frozen set of CRNs, None if every section is interested
+        """
+
+        if course_ids is None or isinstance(course_ids, frozenset):
+            return course_ids
+        if isinstance(course_ids, (list, tuple, set)):
+            return frozenset(str(ci) for ci in course_ids)
+        return frozenset((str(course_ids),))
+
+    @staticmethod
+    def _filter_headers(headers: Dict) -> Dict:
+        """
+        drop the pseudo and hop-by-hop headers of a browser request so they can be replayed over the pooled session
+
+        :param headers: all headers of the browser request
+        :return: the replayable headers
+        """
+
+        return {
+            key: value for key, value in headers.items()
+            if not key.startswith(":") and key.lower() not in ("host", "content-length", "connection")
+        }
+
+    @staticmethod
+    def _params_from_url(url: str, params: Dict) -> Dict:
+        """
+        take the uniqueSessionId from the url of the refreshed request to pass the request validation
+
+        :param url:     the url of the refreshed request
+        :param params:  the params to update
+        :return: the updated copy of the params
+        """
+
+        params = dict(params)
+        qs = parse_qs(urlparse(url).query)
+        if "uniqueSessionId" in qs and qs["uniqueSessionId"]:
+            params["uniqueSessionId"] = qs["uniqueSessionId"][0]
+        return params
+
+    def _observe_expiry(self) -> None:
+        """
+        record how long the current token lived before a fetch failed on it, once per token
+
+        :return: None
+        """
+
+        with self._token_lock:
+            if self._token_acquired_at is None:
+                return
+            self._token_lifetimes.append(time.monotonic() - self._token_acquired_at)
+            self._token_acquired_at = None
+
+        self.logger.debug(message=f"Token lived {self._token_lifetimes[-1]:.0f}s", role="refresh")
+
+    def _refresh_due_in(self) -> Optional[float]:
+        """
+        estimate the seconds left until the current token should be refreshed, from the typical observed lifetime
+
+        :return: the seconds left (may be negative), None if there is no token or no lifetime learned yet
+        """
+
+        max_age = self._token_max_age()
+        with self._token_lock:
+            if self._token_acquired_at is None or max_age is None:
+                return None
+            return self._token_acquired_at + max_age - time.monotonic()
+
+    def _token_max_age(self) -> Optional[float]:
+        """
+        the age after which a token should be refreshed, from the typical observed lifetime
+
+        :return: the age (in seconds), None if no lifetime learned yet
+        """
+
+        with self._token_lock:
+            if not self._token_lifetimes:
+                return None
+            return statistics.median(self._token_lifetimes) * self.refresh_margin
+
+    def _is_blocked(self, request) -> bool:
+        """
+        tell whether a request of the refresh page is non-essential
+
+        :param request: the intercepted request
+        :return: True if the request should be aborted
+        """
+
+        if request.resource_type in self.block_resources:
+            return True
+        host = urlparse(request.url).hostname or ""
+        return any(host == blocked or host.endswith("." + blocked) for blocked in self.BLOCKED_HOSTS)
+
+    @abstractmethod
+    def _export_cookies(self) -> list:
+        """
+        the cookies of the http session, in the form the token cache keeps them
+
+        :return: the cookies as dicts of name, value, domain and path
+        """
+
+    @abstractmethod
+    def _import_cookies(self, cookies: list) -> None:
+        """
+        set cookies taken from the token cache on the http session
+
+        :param cookies: the cookies as dicts of name, value, domain and path
+        :return: None
+        """
+
+    def _swap_token(self, headers: Dict, params: Dict) -> None:
+        """
+        swap in the refreshed headers & params as a whole
+
+        :param headers: the refreshed headers
+        :param params:  the refreshed params
+        :return: None
+        """
+
+        with self._token_lock:
+            self.headers = headers
+            self.params = params
+            self._token_version += 1
+            self._token_acquired_at = time.monotonic()
+
+    def _read_cached_token(self) -> Optional[Dict]:
+        """
+        read the token another watcher of the same NetID cached, the blocking half of the adoption
+
+        :return: the token, None if there is no fresh one or it is the one already in use
+        """
+
+        try:
+            token = self.token_cache.get(self._cache_key, max_age=self._token_max_age())
+        except Exception as e:
+            self.logger.error(message=f"Failed to read the token cache due to {str(e)}", role="refresh")
+            return None
+        if token is None or token["id"] == self._cached_token_id:
+            return None
+        return token
+
+    def _adopt_token(self, token: Optional[Dict]) -> bool:
+        """
+        swap in a token read from the token cache, dated back to when it was acquired
+
+        :param token: the token, None if there is none to adopt
+        :return: True if the token was adopted
+        """
+
+        if token is None:
+            return False
+
+        self._import_cookies(token["cookies"])
+        self._swap_token(token["headers"], token["params"])
+        age = max(0.0, time.time() - token["stored_at"])
+        with self._token_lock:
+            # the token is as old as its cache entry, not as the adoption, or the proactive refresh fires too late
+            self._token_acquired_at = time.monotonic() - age
+        self._cached_token_id = token["id"]
+        self.logger.info(message=f"Adopted the token cached {age:.0f}s ago", role="refresh")
+        return True
+
+    def _adopt_cached_token(self) -> bool:
+        """
+        swap in the token another watcher of the same NetID cached, unless it is the one already in use
+
+        :return: True if a newer token was adopted
+        """
+
+        return self._adopt_token(self._read_cached_token())
+
+    def _store_cached_token(self) -> None:
+        """
+        share the freshly refreshed token with the other watchers of the same NetID
+
+        :return: None
+        """
+
+        with self._token_lock:
+            headers, params = self.headers, self.params
+        self._put_cached_token(headers, params, self._export_cookies())
+
+    def _put_cached_token(self, headers: Dict, params: Dict, cookies: list) -> None:
+        """
+        write a token to the token cache, the blocking half of sharing it
+
+        :param headers: the headers of the token
+        :param params:  the params of the token
+        :param cookies: the cookies of the token, as dicts of name, value, domain and path
+        :return: None
+        """
+
+        try:
+            token = self.token_cache.put(self._cache_key, headers, params, cookies)
+        except Exception as e:
+            self.logger.error(message=f"Failed to write the token cache due to {str(e)}", role="refresh")
+            return
+        self._cached_token_id = token["id"]
+
+    @staticmethod
+    def _new_unique_session_id() -> str:
+        """
+        generate a uniqueSessionId the way the Banner page script does (5 random characters + epoch milliseconds)
+
+        :return: the uniqueSessionId
+        """
+
+        return "".join(random.choices(string.ascii_lowercase + string.digits, k=5)) + str(int(time.time() * 1000))
+
+    def _default_trigger(self, course_abb: str, course_num: int | str) -> Callable:
+        """
+        Build the default trigger which beeps when a watched section opens up, and logs the other seat transitions
+
+        :param course_abb: The abbreviation of the course (e.g. CS for Computer Science)
+        :param course_num: The number of the course (e.g. 498 is the course number for CS498)
+        :return: the trigger function taking (candidate_list, logger)
+        """
+
+        differ = SeatDiffer()
+
+        def _(candidate_list, logger=self.logger):
+            events = differ.update(candidate_list)
+            course_name = str(course_abb) + str(course_num)
+
+            info_dict = {event.crn: event.after[0] for event in events if event.kind == SeatEvent.OPENED}
+            if info_dict:
+                logger.warning(role="SnowCat", message=f"Course {course_name} available with spots: {info_dict}!")
+                self._notify(f"{course_name} available", f"spots: {info_dict}")
+
+            for event in events:
+                if event.kind == SeatEvent.CLOSED:
+                    logger.info(role="SnowCat", message=f"Course {course_name} section {event.crn} is full again")
+                elif event.kind != SeatEvent.OPENED:
+                    logger.debug(role="SnowCat", message=f"Course {course_name} section {event.crn} {event.kind}: {event.before} -> {event.after}")
+
+        return _
@@ -0,0 +1,112 @@
+import time
+import random
+import threading
+from typing import Optional
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 60,
+        max_reset_timeout: float = 900,
+        jitter: float = 0.2
+    ) -> None:
+        """
+        Trip on consecutive upstream failures, reject requests while Banner is down, then let a single probe through
+
+        :param failure_threshold:   the upstream failures in a row opening the circuit
+        :param reset_timeout:       the seconds the circuit stays open before the first probe
+        :param max_reset_timeout:   the longest the circuit stays open, the timeout doubles per failed probe up to it
+        :param jitter:              the fraction of the timeout that is randomized, so a fleet does not probe in lockstep
+        """
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.jitter = jitter
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self._timeout = reset_timeout
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, key: str = "banner") -> "CircuitBreaker":
+        """
+        Get the process-wide breaker of an upstream, so SnowCat instances in one process trip together
+
+        :param key: the upstream
+        :return: the shared breaker
+        """
+
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls()
+            return cls._shared[key]
+
+    def retry_in(self) -> float:
+        """
+        The seconds until the next probe is let through
+
+        :return: the seconds, 0 unless the circuit is open
+        """
+
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self._probe_at - time.monotonic())
+
+    def allow(self) -> Optional[bool]:
+        """
+        Ask whether a request may go out
+
+        :return: False if the circuit is closed, True if the caller is the single probe and must report its outcome,
+                 None if the request is rejected
+        """
+
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            if self.state == self.OPEN and time.monotonic() >= self._probe_at:
+                self.state = self.HALF_OPEN
+                return True
+            return None
+
+    def record_success(self) -> None:
+        """
+        Record that Banner answered, closing the circuit
+
+        :return: None
+        """
+
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._timeout = self.reset_timeout
+
+    def record_failure(self) -> bool:
+        """
+        Record an upstream failure, opening the circuit after failure_threshold of them or a failed probe
+
+        :return: True if the circuit just opened
+        """
+
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self._timeout = min(self.max_reset_timeout, self._timeout * 2)
+            elif self.state == self.OPEN or self.failures < self.failure_threshold:
+                return False
+
+            self.state = self.OPEN
+            self._probe_at = time.monotonic() + self._timeout * (1 - self.jitter * random.random())
+            return True
@@ -0,0 +1,91 @@
+from typing import List, Dict, Optional, Iterable
+
+
+class SeatEvent:
+    OPENED = "opened"
+    CLOSED = "closed"
+    WAITLIST_CHANGED = "waitlist_changed"
+    ENROLLMENT_CHANGED = "enrollment_changed"
+
+    def __init__(
+        self,
+        kind: str,
+        crn: str,
+        before: Optional[tuple],
+        after: tuple,
+        candidate: Dict
+    ) -> None:
+        """
+        A transition of the seat state of one section
+
+        :param kind:        one of OPENED, CLOSED, WAITLIST_CHANGED, ENROLLMENT_CHANGED
+        :param crn:         the course reference number of the section
+        :param before:      the previous (seatsAvailable, waitAvailable, enrollment, maximumEnrollment), None if first seen
+        :param after:       the current (seatsAvailable, waitAvailable, enrollment, maximumEnrollment)
+        :param candidate:   the section as fetched, a Section record or a raw Banner dict
+        """
+
+        self.kind = kind
+        self.crn = crn
+        self.before = before
+        self.after = after
+        self.candidate = candidate
+
+    def __repr__(self) -> str:
+        return f"SeatEvent({self.kind}, {self.crn}, {self.before} -> {self.after})"
+
+
+class SeatDiffer:
+    # the fields making up the seat state of a section, in the order of SeatEvent.before / SeatEvent.after
+    FIELDS = ("seatsAvailable", "waitAvailable", "enrollment", "maximumEnrollment")
+
+    def __init__(self) -> None:
+        """
+        Keep the last seat state per CRN, and turn every poll into the transitions since the previous one
+        """
+
+        self.states = {}
+
+    def update(self, candidate_list: Iterable[Dict]) -> List[SeatEvent]:
+        """
+        diff the fetched sections against the last known states
+
+        :param candidate_list: the sections of one fetch, Section records or raw Banner dicts
+        :return: the events of the sections whose seat state changed, a section seen for the first time only emits OPENED
+        """
+
+        events = []
+
+        for candidate in candidate_list:
+            crn = candidate["courseReferenceNumber"]
+            after = getattr(candidate, "seat_state", None) or tuple(candidate.get(field) for field in self.FIELDS)
+            before = self.states.get(crn)
+            if before == after:
+                continue
+            self.states[crn] = after
+
+            seats_before = (before[0] or 0) if before is not None else 0
+            seats_after = after[0] or 0
+
+            if seats_before <= 0 < seats_after:
+                events.append(SeatEvent(SeatEvent.OPENED, crn, before, after, candidate))
+            elif seats_after <= 0 < seats_before:
+                events.append(SeatEvent(SeatEvent.CLOSED, crn, before, after, candidate))
+
+            if before is None:
+                continue
+            if before[1] != after[1]:
+                events.append(SeatEvent(SeatEvent.WAITLIST_CHANGED, crn, before, after, candidate))
+            if before[2:] != after[2:]:
+                events.append(SeatEvent(SeatEvent.ENROLLMENT_CHANGED, crn, before, after, candidate))
+
+        return events
+
+    def reset(self) -> None:
+        """
+        forget every known state, so the next update reports the open sections again
+
+        :return: None
+        """
+
+        self.states.clear()
@@ -0,0 +1,171 @@
+import time
+import threading
+from collections import deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Optional, Hashable
+
+from logger import Logger
+
+
+class TriggerDispatcher:
+    def __init__(
+        self,
+        logger: Logger,
+        max_workers: int = 4,
+        max_pending: int = 64,
+        timeout: float = 30
+    ) -> None:
+        """
+        Run the triggers on a bounded thread pool, so the polling loop never waits for an alert or a custom callback
+
+        :param logger:      the logger reporting failed, collapsed, dropped and overdue triggers
+        :param max_workers: the number of triggers running at the same time
+        :param max_pending: the number of triggers queued or running at the same time, beyond it a key only keeps its latest trigger and unkeyed ones are dropped
+        :param timeout:     the seconds after which a trigger still queued or running is reported as overdue
+        """
+
+        self.logger = logger
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="SnowCat-trigger")
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # a key has at most one trigger on the executor, the later ones wait here until it is done
+        self._active = set()
+        self._waiting = {}
+        self._futures = {}
+        self._queued = 0
+        self._closed = False
+
+    def submit(self, trigger: Callable, *args, key: Optional[Hashable] = None) -> bool:
+        """
+        Queue a trigger, triggers of the same key run one after another in the order they were submitted
+
+        :param trigger: the trigger to run
+        :param args:    the arguments of the trigger
+        :param key:     the key serializing the triggers (e.g. the course), None to run unordered
+        :return: False if the trigger was dropped, since the dispatcher is shut down or too many unkeyed ones are pending
+        """
+
+        self.reap()
+
+        with self._lock:
+            if self._closed:
+                return False
+
+            if self._queued >= self.max_pending:
+                if key is None:
+                    self.logger.warning(role="dispatch", message="too many pending triggers, dropping an unkeyed one")
+                    return False
+                waiting = self._waiting.get(key)
+                if waiting:
+                    # the latest candidates supersede the queued ones, so only they are kept, never dropped
+                    self._queued -= len(waiting) - 1
+                    waiting.clear()
+                    waiting.append((trigger, args, time.monotonic()))
+                    self.logger.warning(role="dispatch", message=f"too many pending triggers, keeping only the latest of {key}")
+                    return True
+
+            self._queued += 1
+            if key is not None and key in self._active:
+                self._waiting.setdefault(key, deque()).append((trigger, args, time.monotonic()))
+                return True
+
+            future = self._start(trigger, args, key, time.monotonic())
+
+        future.add_done_callback(partial(self._done, key=key))
+        return True
+
+    def _start(self, trigger: Callable, args: tuple, key: Optional[Hashable], submitted_at: float) -> Future:
+        """
+        hand a trigger to the executor, the caller holds the lock
+
+        :param trigger:      the trigger to run
+        :param args:         the arguments of the trigger
+        :param key:          the key of the trigger
+        :param submitted_at: the time.monotonic() at which the trigger was submitted
+        :return: the future of the trigger
+        """
+
+        future = self._executor.submit(trigger, *args)
+        self._futures[future] = (key, submitted_at, False)
+        if key is not None:
+            self._active.add(key)
+        return future
+
+    def _done(self, future: Future, key: Optional[Hashable]) -> None:
+        """
+        report the error of a finished trigger, if any, and start the next trigger of its key
+
+        :param future:  the future of the trigger
+        :param key:     the key of the trigger
+        :return: None
+        """
+
+        following = None
+        with self._lock:
+            self._futures.pop(future, None)
+            self._queued -= 1
+            if key is not None:
+                waiting = self._waiting.get(key)
+                if waiting:
+                    trigger, args, submitted_at = waiting.popleft()
+                    if not waiting:
+                        del self._waiting[key]
+                    following = self._start(trigger, args, key, submitted_at)
+                else:
+                    self._active.discard(key)
+            if not self._queued:
+                self._idle.notify_all()
+
+        # registered outside the lock, a future already done runs its callback right away
+        if following is not None:
+            following.add_done_callback(partial(self._done, key=key))
+
+        if not future.cancelled() and future.exception() is not None:
+            self.logger.error(role="dispatch", message=f"trigger of {key} failed due to {future.exception()}")
+
+    def reap(self) -> None:
+        """
+        Report the triggers queued or running longer than the timeout, once each
+
+        :return: None
+        """
+
+        now = time.monotonic()
+        with self._lock:
+            overdue = [
+                (future, key, submitted_at) for future, (key, submitted_at, reported) in self._futures.items()
+                if not reported and now - submitted_at > self.timeout
+            ]
+            for future, key, submitted_at in overdue:
+                self._futures[future] = (key, submitted_at, True)
+            behind = {key: len(self._waiting.get(key, ())) for _, key, _ in overdue}
+
+        for future, key, _ in overdue:
+            state = "running" if future.running() else "queued"
+            message = f"trigger of {key} {state} over {self.timeout}s"
+            if behind[key]:
+                message += f", {behind[key]} more of it waiting"
+            self.logger.warning(role="dispatch", message=message)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop accepting triggers, optionally waiting for the queued ones to finish
+
+        :param wait: whether to wait for the queued triggers, otherwise they are cancelled
+        :return: None
+        """
+
+        with self._lock:
+            self._closed = True
+            if wait:
+                while self._queued:
+                    self._idle.wait()
+            else:
+                for waiting in self._waiting.values():
+                    self._queued -= len(waiting)
+                self._waiting.clear()
+
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,93 @@
+from typing import Optional
+
+
+class FetchError(ValueError):
+    # the failure class, picking the backoff and whether a refresh helps, see RetryPolicy
+    kind = "unknown"
+
+
+class NetworkError(FetchError):
+    """
+    The request timed out or the connection failed
+    """
+
+    kind = "network"
+
+
+class DeadlineError(NetworkError):
+    """
+    The connect/read timeouts or the total deadline of a call ran out
+    """
+
+
+class ThrottledError(FetchError):
+    """
+    Banner answered 429, optionally telling how long to back off
+    """
+
+    kind = "throttled"
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ServerError(FetchError):
+    """
+    Banner answered 5xx
+    """
+
+    kind = "server"
+
+
+class DecodeError(FetchError):
+    """
+    The searchResults body is not the json payload it should be
+    """
+
+    kind = "decode"
+
+
+class AuthError(FetchError):
+    """
+    The session cookie or the uniqueSessionId expired, the only failure a refresh fixes
+    """
+
+    kind = "auth"
+
+
+class CircuitOpenError(FetchError):
+    """
+    Banner looks down and the circuit breaker is open, nothing is sent until the next probe
+    """
+
+    kind = "unavailable"
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def raise_for_status(status_code: int, response_headers) -> None:
+    """
+    Turn the status of a searchResults response into the matching FetchError
+
+    :param status_code:         the status code of the response
+    :param response_headers:    the headers of the response
+    :return: None
+    """
+
+    if status_code == 429:
+        retry_after = response_headers.get("Retry-After")
+        try:
+            retry_after = float(retry_after) if retry_after is not None else None
+        except ValueError:
+            # an http date, not worth parsing
+            retry_after = None
+        raise ThrottledError(f"throttled, state: {status_code}", retry_after=retry_after)
+    if status_code >= 500:
+        raise ServerError(f"server failed, state: {status_code}")
+    if status_code in (401, 403) or 300 <= status_code < 400 and status_code != 304:
+        # Banner redirects an expired session to the SSO login
+        raise AuthError(f"session expired, state: {status_code}")
+
@@ -0,0 +1,83 @@
+import os
+import tempfile
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # windows
+    fcntl = None
+    import msvcrt
+
+
+def lock_file(f) -> None:
+    """
+    Take the exclusive lock of an open file, blocking while another process holds it
+
+    :param f: the open file
+    :return: None
+    """
+
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def try_lock_file(f) -> bool:
+    """
+    Take the exclusive lock of an open file only if no other process holds it
+
+    :param f: the open file
+    :return: True if the lock was taken
+    """
+
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def unlock_file(f) -> None:
+    """
+    Release the lock of an open file taken by lock_file or try_lock_file
+
+    :param f: the open file
+    :return: None
+    """
+
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def write_private(path: os.PathLike | str, text: str) -> None:
+    """
+    Replace a file atomically with a file only the owner can read, for the files holding login secrets
+
+    :param path: the file to replace
+    :param text: the content of the file
+    :return: None
+    """
+
+    path = Path(path)
+    # mkstemp creates the file 0600 right away, so the secret is never readable by others, not even for a moment
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
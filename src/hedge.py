@@ -0,0 +1,189 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from timing import AttemptLog
+
+T = TypeVar("T")
+
+
+class Hedger:
+    def __init__(
+        self,
+        attempts: AttemptLog,
+        name: str = "searchResults",
+        percentile: float = 95,
+        min_samples: int = 20,
+        max_rate: float = 0.1,
+        max_workers: int = 8
+    ) -> None:
+        """
+        Send a duplicate of a request that has not answered within a latency percentile, keep whichever answers first
+
+        :param attempts:    the attempt log the latencies are taken from
+        :param name:        the name of the attempts that are hedged
+        :param percentile:  the latency percentile after which the duplicate goes out
+        :param min_samples: the answered attempts needed before hedging starts
+        :param max_rate:    the largest fraction of requests hedged, further hedges are skipped to bound the extra load
+        :param max_workers: the threads sending the sync requests and their duplicates
+        """
+
+        self.attempts = attempts
+        self.name = name
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_rate = max_rate
+        self.max_workers = max_workers
+
+        self.requests = 0
+        self.hedged = 0
+        self.won = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """
+        The fraction of requests that were hedged
+        """
+
+        return self.hedged / self.requests if self.requests else 0.0
+
+    def report(self) -> Dict[str, float]:
+        """
+        The hedging counters, to keep an eye on the extra load
+
+        :return: the requests, the hedged ones, the ones the duplicate won, and the hedge rate
+        """
+
+        return {"requests": self.requests, "hedged": self.hedged, "won": self.won, "rate": self.rate}
+
+    def delay(self) -> Optional[float]:
+        """
+        How long to wait for a request before sending its duplicate
+
+        :return: the latency percentile (in seconds), None to not hedge (too few samples or over the hedge budget)
+        """
+
+        if self.hedged >= self.max_rate * self.requests:
+            return None
+        latencies = self.attempts.latencies(self.name)
+        if len(latencies) < self.min_samples:
+            return None
+        return self.attempts.percentile(self.percentile, self.name)
+
+    @staticmethod
+    def _discard(future: Future) -> None:
+        """
+        close the response of the losing request once it arrives
+
+        :param future: the future of the losing request
+        :return: None
+        """
+
+        if not future.cancelled() and future.exception() is None:
+            close = getattr(future.result(), "close", None)
+            if close is not None:
+                close()
+
+    def call(self, send: Callable[[], T], admit: Optional[Callable[[], bool]] = None) -> T:
+        """
+        Send a request, hedged by a duplicate if it is slower than the percentile
+
+        :param send:    the function sending the request, called once more for the duplicate
+        :param admit:   the function taking the rate limiter token of the duplicate without waiting, None to always send it
+        :return: the response answering first
+        """
+
+        with self._lock:
+            self.requests += 1
+        after = self.delay()
+        if after is None:
+            return send()
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="SnowCat-hedge")
+
+        primary = self._executor.submit(send)
+        try:
+            return primary.result(timeout=after)
+        except FutureTimeoutError:
+            pass
+
+        # a duplicate queueing on the limiter would only answer later than the primary
+        if admit is not None and not admit():
+            return primary.result()
+
+        with self._lock:
+            self.hedged += 1
+        hedge = self._executor.submit(send)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            answered = [future for future in done if future.exception() is None]
+            if answered:
+                for loser in pending:
+                    if not loser.cancel():
+                        loser.add_done_callback(self._discard)
+                if hedge in answered and primary not in answered:
+                    with self._lock:
+                        self.won += 1
+                    return hedge.result()
+                return answered[0].result()
+
+        return primary.result()
+
+    async def call_async(self, send: Callable[[], Awaitable[T]], admit: Optional[Callable[[], Awaitable[bool]]] = None) -> T:
+        """
+        Send a request, hedged by a duplicate if it is slower than the percentile, the loser is cancelled
+
+        :param send:    the coroutine function sending the request, called once more for the duplicate
+        :param admit:   the coroutine function taking the rate limiter token of the duplicate without waiting, None to always send it
+        :return: the response answering first
+        """
+
+        with self._lock:
+            self.requests += 1
+        after = self.delay()
+        if after is None:
+            return await send()
+
+        primary = asyncio.ensure_future(send())
+        done, _ = await asyncio.wait({primary}, timeout=after)
+        if done:
+            return primary.result()
+
+        # a duplicate queueing on the limiter would only answer later than the primary
+        if admit is not None and not await admit():
+            return await primary
+
+        with self._lock:
+            self.hedged += 1
+        hedge = asyncio.ensure_future(send())
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            answered = [task for task in done if task.exception() is None]
+            if answered:
+                # cancelling closes the connection of the loser
+                for loser in pending:
+                    loser.cancel()
+                if hedge in answered and primary not in answered:
+                    with self._lock:
+                        self.won += 1
+                    return hedge.result()
+                return answered[0].result()
+
+        return primary.result()
+
+    def close(self) -> None:
+        """
+        Stop the threads sending the sync requests
+
+        :return: None
+        """
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import threading
+import subprocess
+import importlib
+import urllib.request
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable
+
+from logger import Logger
+
+
+class Notifier(ABC):
+    @abstractmethod
+    def notify(self, title: str, message: str) -> None:
+        """
+        Deliver one notification
+
+        :param title:   the title of the notification
+        :param message: the body of the notification
+        :return: None
+        """
+
+    def close(self) -> None:
+        """
+        Release whatever the backend holds
+
+        :return: None
+        """
+
+        pass
+
+
+class BellNotifier(Notifier):
+    def __init__(self, repeat: int = 1) -> None:
+        """
+        Ring the terminal bell
+
+        :param repeat: the rings per notification
+        """
+
+        self.repeat = repeat
+
+    def notify(self, title: str, message: str) -> None:
+        sys.stdout.write("\a" * self.repeat)
+        sys.stdout.flush()
+
+
+class WinsoundNotifier(Notifier):
+    def __init__(self, repeat: int = 5, gap: float = 1.5) -> None:
+        """
+        Beep through winsound, windows only
+
+        :param repeat:  the beeps per notification
+        :param gap:     the seconds between two beeps
+        """
+
+        self._winsound = importlib.import_module("winsound")
+        self.repeat = repeat
+        self.gap = gap
+
+    def notify(self, title: str, message: str) -> None:
+        for i in range(self.repeat):
+            if i:
+                time.sleep(self.gap)
+            self._winsound.MessageBeep()
+
+
+class DesktopNotifier(Notifier):
+    def __init__(self) -> None:
+        """
+        Pop a desktop notification through plyer if installed, otherwise through notify-send / osascript
+        """
+
+        try:
+            self._plyer = importlib.import_module("plyer")
+        except ImportError:
+            self._plyer = None
+
+        if self._plyer is None and shutil.which("notify-send") is None and shutil.which("osascript") is None:
+            raise RuntimeError("no desktop notification backend found, install plyer or notify-send")
+
+    def notify(self, title: str, message: str) -> None:
+        if self._plyer is not None:
+            self._plyer.notification.notify(title=title, message=message)
+        elif shutil.which("notify-send") is not None:
+            subprocess.run(["notify-send", title, message], check=False, timeout=10)
+        else:
+            script = f"display notification {json.dumps(message)} with title {json.dumps(title)}"
+            subprocess.run(["osascript", "-e", script], check=False, timeout=10)
+
+
+class WebhookNotifier(Notifier):
+    def __init__(self, url: str, timeout: float = 5) -> None:
+        """
+        POST every notification as json ({"title": ..., "message": ...}) to a local webhook
+
+        :param url:     the url of the webhook
+        :param timeout: the seconds to wait for the webhook
+        """
+
+        self.url = url
+        self.timeout = timeout
+
+    def notify(self, title: str, message: str) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"title": title, "message": message}).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class FileNotifier(Notifier):
+    def __init__(self, path: os.PathLike | str) -> None:
+        """
+        Append every notification as a line to a file, or write it to a FIFO if a reader is attached
+
+        :param path: the path of the file or FIFO
+        """
+
+        self.path = Path(path)
+
+    def notify(self, title: str, message: str) -> None:
+        line = f"{time.strftime('%m/%d/%y %H:%M:%S')} {title}: {message}\n".encode()
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_NONBLOCK", 0)
+        fd = os.open(self.path, flags, 0o600)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+
+class CallbackNotifier(Notifier):
+    def __init__(self, callback: Callable[[str, str], None]) -> None:
+        """
+        Hand every notification to a callback
+
+        :param callback: the function taking (title, message)
+        """
+
+        self.callback = callback
+
+    def notify(self, title: str, message: str) -> None:
+        self.callback(title, message)
+
+
+class BatchingNotifier(Notifier):
+    def __init__(self, backend: Notifier, logger: Logger, window: float = 1.0) -> None:
+        """
+        Deliver notifications on a background thread, coalescing a burst within the window into a single one
+
+        :param backend: the notifier actually delivering
+        :param logger:  the logger reporting failed deliveries
+        :param window:  the seconds a burst is collected for after its first notification
+        """
+
+        self.backend = backend
+        self.logger = logger
+        self.window = window
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="SnowCat-notifier", daemon=True)
+        self._thread.start()
+
+    def notify(self, title: str, message: str) -> None:
+        self._queue.put((title, message))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+
+            deadline = time.monotonic() + self.window
+            while (left := deadline - time.monotonic()) > 0:
+                try:
+                    item = self._queue.get(timeout=left)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._deliver(batch)
+                    return
+                batch.append(item)
+
+            self._deliver(batch)
+
+    def _deliver(self, batch: list[tuple[str, str]]) -> None:
+        """
+        deliver a burst as one notification
+
+        :param batch: the (title, message) of the burst
+        :return: None
+        """
+
+        if len(batch) == 1:
+            title, message = batch[0]
+        else:
+            title = f"{len(batch)} notifications"
+            message = "\n".join(f"{t}: {m}" for t, m in batch)
+
+        try:
+            self.backend.notify(title, message)
+        except Exception as e:
+            self.logger.error(role="notify", message=f"failed to notify due to {str(e)}")
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=self.window + 30)
+        self.backend.close()
+
+
+def get_notifier(name: str = 'auto', **kwargs) -> Notifier:
+    """
+    Build a notifier backend by name, the backend dependencies are only imported here
+
+    :param name:    'bell', 'winsound', 'desktop', 'webhook' (url=...), 'file' (path=...), 'callback' (callback=...),
+                    or 'auto' for winsound on windows and the terminal bell elsewhere
+    :param kwargs:  the arguments of the backend
+    :return: the notifier
+    """
+
+    if name == "auto":
+        name = "winsound" if sys.platform == "win32" else "bell"
+
+    backends = {
+        "bell": BellNotifier,
+        "winsound": WinsoundNotifier,
+        "desktop": DesktopNotifier,
+        "webhook": WebhookNotifier,
+        "file": FileNotifier,
+        "callback": CallbackNotifier,
+    }
+    if name not in backends:
+        raise ValueError(f"unknown notifier: {name}")
+    return backends[name](**kwargs)
@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+from fileutil import lock_file, unlock_file
+
+
+class TokenBucket:
+    # whether reserve may block on a lock shared with other processes, async callers then run it on a thread
+    blocking = False
+
+    def __init__(self, rate: float, burst: int) -> None:
+        """
+        A thread-safe token bucket, refilled at rate tokens per second up to burst tokens
+
+        :param rate:    the tokens refilled per second, i.e. the sustained request rate
+        :param burst:   the capacity of the bucket, i.e. the requests allowed back to back
+        """
+
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Take the tokens if there are enough of them, without blocking
+
+        :param tokens: the tokens to take
+        :return: 0 if the tokens were taken, otherwise the seconds to wait before trying again
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+
+class FileTokenBucket(TokenBucket):
+    blocking = True
+
+    def __init__(self, path: os.PathLike | str, rate: float, burst: int) -> None:
+        """
+        A token bucket kept in a locked local file, so every process on the machine draws from the same bucket
+
+        :param path:    the file holding the bucket state
+        :param rate:    the tokens refilled per second, i.e. the sustained request rate
+        :param burst:   the capacity of the bucket, i.e. the requests allowed back to back
+        """
+
+        super().__init__(rate=rate, burst=burst)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+
+    def reserve(self, tokens: float = 1) -> float:
+        with self._lock, open(self.path, "r+") as f:
+            lock_file(f)
+            try:
+                f.seek(0)
+                raw = f.read()
+                try:
+                    state = json.loads(raw) if raw.strip() else {}
+                except ValueError:
+                    # a process killed mid-write leaves partial json behind, start over from a full bucket
+                    state = {}
+                if not isinstance(state, dict):
+                    state = {}
+
+                # wall clock time, since monotonic clocks are not comparable across processes
+                now = time.time()
+                stored = state.get("tokens", float(self.burst))
+                updated_at = state.get("updated_at", now)
+                available = min(self.burst, stored + max(0.0, now - updated_at) * self.rate)
+
+                if available >= tokens:
+                    available -= tokens
+                    wait = 0.0
+                else:
+                    wait = (tokens - available) / self.rate
+
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({"tokens": available, "updated_at": now}))
+                f.flush()
+                return wait
+            finally:
+                unlock_file(f)
+
+
+class RateLimiter:
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    # the token already drawn for the next request sent in this context, see prepaid
+    _prepaid = contextvars.ContextVar("prepaid", default=None)
+
+    def __init__(
+        self,
+        rate: float = 5,
+        burst: int = 10,
+        limits: Optional[Dict[str, tuple[float, int]]] = None,
+        coordinator_dir: Optional[os.PathLike | str] = None
+    ) -> None:
+        """
+        Bound the requests per host with one token bucket per host, every fetch and refresh of a SnowCat goes through it
+
+        :param rate:            the default sustained requests per second of a host
+        :param burst:           the default requests allowed back to back to a host
+        :param limits:          the (rate, burst) of specific hosts, overriding the defaults
+        :param coordinator_dir: the directory of the bucket files shared with other processes, None to limit this process only
+        """
+
+        self.rate = rate
+        self.burst = burst
+        self.limits = dict(limits or {})
+        self.coordinator_dir = Path(coordinator_dir) if coordinator_dir is not None else None
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(
+        cls,
+        rate: float = 5,
+        burst: int = 10,
+        coordinator_dir: Optional[os.PathLike | str] = None
+    ) -> "RateLimiter":
+        """
+        Get the process-wide limiter of the given configuration, so SnowCat instances in one process share their budget
+
+        :param rate:            the default sustained requests per second of a host
+        :param burst:           the default requests allowed back to back to a host
+        :param coordinator_dir: the directory of the bucket files shared with other processes, None to limit this process only
+        :return: the shared limiter
+        """
+
+        key = (rate, burst, str(coordinator_dir) if coordinator_dir is not None else None)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(rate=rate, burst=burst, coordinator_dir=coordinator_dir)
+            return cls._shared[key]
+
+    def bucket(self, url: str) -> TokenBucket:
+        """
+        Get the bucket of the host of a url
+
+        :param url: the url about to be requested
+        :return: the bucket of its host
+        """
+
+        host = urlparse(url).hostname or ""
+        with self._lock:
+            if host not in self._buckets:
+                rate, burst = self.limits.get(host, (self.rate, self.burst))
+                if self.coordinator_dir is not None:
+                    self._buckets[host] = FileTokenBucket(self.coordinator_dir / f"{host}.bucket", rate=rate, burst=burst)
+                else:
+                    self._buckets[host] = TokenBucket(rate=rate, burst=burst)
+            return self._buckets[host]
+
+    @classmethod
+    @contextmanager
+    def prepaid(cls) -> Iterator[None]:
+        """
+        Mark the next request sent within as paid for, so the adapter or transport does not draw a token for it again,
+        the ones following it (e.g. redirects) still draw their own
+
+        :return: the context
+        """
+
+        reset = cls._prepaid.set([True])
+        try:
+            yield
+        finally:
+            cls._prepaid.reset(reset)
+
+    @classmethod
+    def take_prepaid(cls) -> bool:
+        """
+        Use up the token drawn for the request about to be sent, if any
+
+        :return: True if the request is paid for
+        """
+
+        credit = cls._prepaid.get()
+        if credit:
+            credit.pop()
+            return True
+        return False
+
+    def try_acquire(self, url: str) -> bool:
+        """
+        Take a token for a request to the host of a url only if one is available right away
+
+        :param url: the url about to be requested
+        :return: True if the token was taken
+        """
+
+        return self.bucket(url).reserve() == 0
+
+    async def try_acquire_async(self, url: str) -> bool:
+        """
+        Take a token for a request to the host of a url only if one is available right away, without blocking the event loop
+
+        :param url: the url about to be requested
+        :return: True if the token was taken
+        """
+
+        return await self._reserve_async(self.bucket(url)) == 0
+
+    def acquire(self, url: str) -> float:
+        """
+        Block until a request to the host of a url is allowed
+
+        :param url: the url about to be requested
+        :return: the seconds waited
+        """
+
+        bucket = self.bucket(url)
+        waited = 0.0
+        while (wait := bucket.reserve()) > 0:
+            time.sleep(wait)
+            waited += wait
+        return waited
+
+    async def acquire_async(self, url: str) -> float:
+        """
+        Wait, without blocking the event loop, until a request to the host of a url is allowed
+
+        :param url: the url about to be requested
+        :return: the seconds waited
+        """
+
+        bucket = self.bucket(url)
+        waited = 0.0
+        while (wait := await self._reserve_async(bucket)) > 0:
+            await asyncio.sleep(wait)
+            waited += wait
+        return waited
+
+    @staticmethod
+    async def _reserve_async(bucket: TokenBucket) -> float:
+        """
+        reserve a token of a bucket, on a thread if it waits for a file lock, so the event loop never blocks on it
+
+        :param bucket: the bucket
+        :return: 0 if the token was taken, otherwise the seconds to wait before trying again
+        """
+
+        if bucket.blocking:
+            return await asyncio.to_thread(bucket.reserve)
+        return bucket.reserve()
@@ -0,0 +1,199 @@
+import time
+from collections import deque
+from typing import List, Dict, Optional, Iterable
+
+import requests
+
+from differ import SeatDiffer, SeatEvent
+
+
+class AutoRegistrar:
+    def __init__(
+        self,
+        cat,
+        crns: Iterable[int | str],
+        term: Optional[str] = None,
+        timeout: float = 10,
+        retry_after: float = 60
+    ) -> None:
+        """
+        Add the watched CRNs the moment a seat opens, reusing the session and the token captured by the SnowCat refresh
+
+        :param cat:     the SnowCat whose pooled session, headers and params the registration requests reuse
+        :param crns:    the CRNs to add when a seat opens, each is added at most once
+        :param term:    the term code to register in, defaults to the term the search session is primed for
+        :param timeout: the seconds to wait for Banner to answer a registration request
+        :param retry_after: the seconds to wait before arming again after a failed arming
+        """
+
+        self.cat = cat
+        self.crns = frozenset(str(crn) for crn in crns)
+        self.term = term
+        self.timeout = timeout
+        self.retry_after = retry_after
+
+        self.differ = SeatDiffer()
+        self.registered = set()
+        self.latencies = deque(maxlen=64)
+
+        self._prepared = {}
+        self._armed_version = None
+        self._retry_at = 0.0
+
+    def arm(self) -> None:
+        """
+        Switch the session to registration mode and pre-build the add request of every CRN, done again per token
+
+        :return: None
+        """
+
+        cat = self.cat
+        with cat._token_lock:
+            headers = dict(cat.headers)
+            params = dict(cat.params)
+            version = cat._token_version
+
+        term = self.term or params.get("txt_term")
+        if term is None:
+            response = cat._request(
+                "getTerms", cat.session, "GET", f"{cat.ssb_prefix}/classSearch/getTerms",
+                params={"searchTerm": "", "offset": 1, "max": 10},
+                headers=headers
+            )
+            term = response.json()[0]["code"]
+        self.term = term
+
+        response = cat._request(
+            "term/search", cat.session, "POST", f"{cat.ssb_prefix}/term/search",
+            params={"mode": "registration"},
+            data={"term": term, "uniqueSessionId": params.get("uniqueSessionId", "")},
+            headers=headers,
+            allow_redirects=False
+        )
+        if response.status_code != 200:
+            raise ValueError(f"failed to enter registration for term {term}, state: {response.status_code}")
+
+        self._prepared = {
+            crn: cat.session.prepare_request(requests.Request(
+                "GET",
+                f"{cat.ssb_prefix}/classRegistration/addRegistrationItem",
+                params={"term": term, "courseReferenceNumber": crn, "olr": "false"},
+                headers=headers
+            ))
+            for crn in self.crns - self.registered
+        }
+        self._armed_version = version
+        cat.logger.info(role="register", message=f"armed auto-register of {sorted(self._prepared)} in term {term}")
+
+    def ensure_armed(self) -> bool:
+        """
+        Arm again if the token was swapped since the last arming, logging instead of raising on failure
+        and holding off for retry_after seconds after a failure, so a broken session is not hit on every poll
+
+        :return: True if the pre-built requests match the current token
+        """
+
+        if self._armed_version == self.cat._token_version and self._prepared.keys() == self.crns - self.registered:
+            return True
+        if not self.crns - self.registered or time.monotonic() < self._retry_at:
+            return False
+
+        try:
+            self.arm()
+        except Exception as e:
+            self.cat.logger.error(role="register", message=f"failed to arm auto-register due to {str(e)}, retrying in {self.retry_after}s")
+            self._retry_at = time.monotonic() + self.retry_after
+            return False
+        return True
+
+    def check(self, candidate_list: Iterable[Dict], detected_at: Optional[float] = None) -> List[SeatEvent]:
+        """
+        Diff the fetched sections and register every armed CRN that just opened
+
+        :param candidate_list:  the sections of one fetch
+        :param detected_at:     the time.perf_counter() at which the fetch returned, for the detection-to-submission latency
+        :return: the OPENED events of the armed CRNs
+        """
+
+        detected_at = detected_at if detected_at is not None else time.perf_counter()
+        opened = [
+            event for event in self.differ.update(candidate_list)
+            if event.kind == SeatEvent.OPENED and event.crn in self.crns and event.crn not in self.registered
+        ]
+        for event in opened:
+            self.register(event.crn, detected_at)
+        return opened
+
+    def register(self, crn: str, detected_at: Optional[float] = None) -> bool:
+        """
+        Fire the pre-built add request of a CRN, then submit the registration batch with the model Banner returns
+
+        :param crn:         the CRN to add
+        :param detected_at: the time.perf_counter() at which the opening was detected
+        :return: True if Banner accepted the registration
+        """
+
+        cat = self.cat
+        try:
+            if self._armed_version != cat._token_version or crn not in self._prepared:
+                self.arm()
+
+            submitted_at = time.perf_counter()
+            response = cat.session.send(self._prepared[crn], timeout=self.timeout)
+            if detected_at is not None:
+                self.latencies.append(submitted_at - detected_at)
+                cat.logger.info(role="register", message=f"add {crn} submitted {(submitted_at - detected_at) * 1000:.1f}ms after detection")
+
+            added = response.json()
+            if not added.get("success"):
+                cat.logger.error(role="register", message=f"failed to add {crn}: {added.get('message')}")
+                return False
+
+            model = added["model"]
+            model["selectedAction"] = "RW"
+            with cat._token_lock:
+                unique_session_id = cat.params.get("uniqueSessionId", "")
+                headers = cat.headers
+            response = cat.session.post(
+                f"{cat.ssb_prefix}/classRegistration/submitRegistration/batch",
+                json={"create": [], "update": [model], "destroy": [], "uniqueSessionId": unique_session_id},
+                headers=headers,
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            registered, messages = self._outcome(response.json(), crn)
+
+        except Exception as e:
+            cat.logger.error(role="register", message=f"failed to register {crn} due to {str(e)}")
+            return False
+
+        if not registered:
+            cat.logger.error(role="register", message=f"Banner refused to register {crn}: {'; '.join(messages) or 'no reason given'}")
+            return False
+
+        self.registered.add(crn)
+        self._prepared.pop(crn, None)
+        cat.logger.warning(role="register", message=f"registered {crn}")
+        cat._notify(f"Registered {crn}", "Banner registered the section, check the Banner schedule")
+        return True
+
+    @staticmethod
+    def _outcome(batch: Dict, crn: str) -> tuple[bool, List[str]]:
+        """
+        read the outcome of a CRN from the submitRegistration/batch response, whose update items carry the statusIndicator
+        of every section of the schedule, "R" once registered
+
+        :param batch:   the decoded batch response
+        :param crn:     the CRN submitted
+        :return: whether the CRN is registered, and the messages Banner attached to it
+        """
+
+        for item in (batch.get("data") or {}).get("update") or ():
+            if str(item.get("courseReferenceNumber")) != crn:
+                continue
+            messages = [
+                message.get("message", "") if isinstance(message, dict) else str(message)
+                for message in item.get("messages") or ()
+            ]
+            return item.get("statusIndicator") == "R", messages
+        return False, [f"{crn} is missing from the batch response"]
@@ -0,0 +1,114 @@
+import random
+from collections import Counter
+from typing import Dict, Optional
+
+
+class RetryDecision:
+    def __init__(self, kind: str, attempt: int, delay: float, refresh: bool, alert: bool, give_up: bool) -> None:
+        """
+        What the watcher does about one failed fetch
+
+        :param kind:    the failure class, see FetchError.kind
+        :param attempt: the consecutive failures of this class, including this one
+        :param delay:   the seconds to back off before the next try
+        :param refresh: whether the token is refreshed before the next try, only for auth failures
+        :param alert:   whether the failure is worth a notification, the first one and then every doubling
+        :param give_up: whether the watcher stops, only after give_up_after failures in a row
+        """
+
+        self.kind = kind
+        self.attempt = attempt
+        self.delay = delay
+        self.refresh = refresh
+        self.alert = alert
+        self.give_up = give_up
+
+    def __repr__(self) -> str:
+        return f"RetryDecision({self.kind} #{self.attempt}, delay={self.delay:.1f}s, refresh={self.refresh})"
+
+
+class RetryPolicy:
+    # the (base, cap) of the exponential backoff per failure class (in seconds)
+    BACKOFF = {
+        "network": (1, 60),
+        "throttled": (10, 600),
+        "server": (5, 300),
+        "decode": (1, 60),
+        "auth": (0, 300),
+        "unavailable": (5, 900),
+        "unknown": (5, 300),
+    }
+
+    def __init__(
+        self,
+        backoff: Optional[Dict[str, tuple[float, float]]] = None,
+        jitter: float = 0.5,
+        give_up_after: Optional[int] = None
+    ) -> None:
+        """
+        The failure state machine of a watcher: healthy until a fetch fails, then backing off per failure class until one succeeds
+
+        :param backoff:         the (base, cap) of specific failure classes, overriding BACKOFF
+        :param jitter:          the fraction of every delay that is randomized, so watchers do not retry in lockstep
+        :param give_up_after:   the failures in a row after which the watcher stops, None to never give up
+        """
+
+        self.backoff = dict(self.BACKOFF, **(backoff or {}))
+        self.jitter = jitter
+        self.give_up_after = give_up_after
+
+        self.failures = 0
+        self.streaks = Counter()
+
+    @property
+    def healthy(self) -> bool:
+        return self.failures == 0
+
+    def failure(self, error: Exception) -> RetryDecision:
+        """
+        Record a failed fetch and decide how to go on
+
+        :param error: the error of the fetch, classified by its kind attribute
+        :return: the decision
+        """
+
+        kind = getattr(error, "kind", "unknown")
+        if kind not in self.backoff:
+            kind = "unknown"
+
+        self.failures += 1
+        self.streaks[kind] += 1
+        attempt = self.streaks[kind]
+
+        base, cap = self.backoff[kind]
+        if kind == "auth":
+            # the first auth failure refreshes right away, a refresh failing again backs off like everything else
+            delay = 0.0 if attempt == 1 else min(cap, max(1.0, base) * 2 ** (attempt - 2))
+        else:
+            delay = min(cap, base * 2 ** (attempt - 1))
+        delay *= 1 - self.jitter * random.random()
+
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        return RetryDecision(
+            kind=kind,
+            attempt=attempt,
+            delay=delay,
+            refresh=kind == "auth",
+            alert=self.failures & (self.failures - 1) == 0,
+            give_up=self.give_up_after is not None and self.failures >= self.give_up_after
+        )
+
+    def success(self) -> int:
+        """
+        Record a successful fetch, back to healthy
+
+        :return: the failures in a row it recovered from
+        """
+
+        failures = self.failures
+        self.failures = 0
+        self.streaks.clear()
+        return failures
@@ -0,0 +1,124 @@
+import time
+import heapq
+import itertools
+from datetime import datetime
+from typing import Optional, Hashable, Iterable
+
+
+class AdaptiveScheduler:
+    def __init__(
+        self,
+        interval: float = 15,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        budget: Optional[float] = None,
+        deadlines: Optional[Iterable[datetime]] = None,
+        deadline_window: float = 3600,
+        tighten: float = 0.5,
+        relax: float = 1.25
+    ) -> None:
+        """
+        Schedule the polls of many courses, tightening the interval of courses with seat churn and relaxing quiet ones
+
+        :param interval:        the starting interval of every course (in seconds)
+        :param min_interval:    the shortest interval a course can tighten to (in seconds), defaults to interval
+        :param max_interval:    the longest interval a course can relax to (in seconds), defaults to interval
+        :param budget:          the global request budget of all courses together (in requests per minute), None for unbounded
+        :param deadlines:       the add/drop deadlines, every course polls at min_interval within deadline_window before one
+        :param deadline_window: how long before a deadline the polling is tightened (in seconds)
+        :param tighten:         the factor applied to the interval of a course whose last poll changed
+        :param relax:           the factor applied to the interval of a course whose last poll was unchanged
+        """
+
+        self.min_interval = min_interval if min_interval is not None else interval
+        self.max_interval = max_interval if max_interval is not None else interval
+        if self.min_interval > self.max_interval:
+            raise ValueError(f"min_interval {self.min_interval} is larger than max_interval {self.max_interval}")
+
+        self.interval = self._clamp(interval)
+        self.budget = budget
+        self.deadlines = sorted(deadlines or ())
+        self.deadline_window = deadline_window
+        self.tighten = tighten
+        self.relax = relax
+
+        self.intervals = {}
+        self._heap = []
+        self._counter = itertools.count()
+
+    def _clamp(self, interval: float) -> float:
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def _near_deadline(self) -> bool:
+        """
+        tell whether an add/drop deadline is coming up within the deadline window
+
+        :return: True if the polling should be as tight as allowed
+        """
+
+        now = datetime.now()
+        return any(0 <= (deadline - now).total_seconds() <= self.deadline_window for deadline in self.deadlines)
+
+    def _budget_scale(self) -> float:
+        """
+        the factor stretching every interval so the total request rate of all courses stays within the budget
+
+        :return: the factor, 1 if within the budget
+        """
+
+        if self.budget is None or not self.intervals:
+            return 1.0
+        rate = sum(60 / interval for interval in self.intervals.values())
+        return max(1.0, rate / self.budget)
+
+    def add(self, key: Hashable) -> None:
+        """
+        Add a course, due right away
+
+        :param key: the key of the course
+        :return: None
+        """
+
+        self.intervals[key] = self.interval
+        self.schedule(key, 0)
+
+    def record(self, key: Hashable, churned: bool) -> float:
+        """
+        Adapt the interval of a course to the outcome of its last poll
+
+        :param key:     the key of the course
+        :param churned: whether the last poll of the course saw a change
+        :return: the delay until the next poll of the course (in seconds), within the global budget
+        """
+
+        interval = self.intervals[key]
+        if self._near_deadline():
+            interval = self.min_interval
+        elif churned:
+            interval = interval * self.tighten
+        else:
+            interval = interval * self.relax
+        self.intervals[key] = self._clamp(interval)
+
+        return self.intervals[key] * self._budget_scale()
+
+    def schedule(self, key: Hashable, delay: float) -> None:
+        """
+        Schedule the next poll of a course
+
+        :param key:     the key of the course
+        :param delay:   the delay until the next poll (in seconds)
+        :return: None
+        """
+
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._counter), key))
+
+    def next_due(self) -> tuple[Hashable, float]:
+        """
+        Pop the course polled next
+
+        :return: the key of the course, and how long to wait before polling it (in seconds)
+        """
+
+        due, _, key = heapq.heappop(self._heap)
+        return key, max(0.0, due - time.monotonic())
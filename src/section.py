@@ -0,0 +1,143 @@
+from collections.abc import Mapping
+from typing import Dict, Optional, Callable, Iterator, Any
+
+
+class Section(Mapping):
+    # the Banner key of every typed field
+    KEY_MAP = {
+        "courseReferenceNumber": "crn",
+        "subject": "subject",
+        "courseNumber": "course_number",
+        "seatsAvailable": "seats_available",
+        "waitAvailable": "wait_available",
+        "waitCount": "wait_count",
+        "waitCapacity": "wait_capacity",
+        "enrollment": "enrollment",
+        "maximumEnrollment": "maximum_enrollment",
+    }
+
+    __slots__ = tuple(KEY_MAP.values()) + ("_extra", "_loader")
+
+    def __init__(
+        self,
+        crn: str,
+        subject: Optional[str] = None,
+        course_number: Optional[str] = None,
+        seats_available: Optional[int] = None,
+        wait_available: Optional[int] = None,
+        wait_count: Optional[int] = None,
+        wait_capacity: Optional[int] = None,
+        enrollment: Optional[int] = None,
+        maximum_enrollment: Optional[int] = None,
+        extra: Optional[Dict] = None,
+        loader: Optional[Callable[[str], Optional[Dict]]] = None
+    ) -> None:
+        """
+        A compact record of one section, readable both by attribute and as a read-only Mapping keyed like Banner,
+        use to_dict for a plain dict (e.g. for json.dumps)
+
+        :param crn:                 the course reference number
+        :param subject:             the subject abbreviation (e.g. CS)
+        :param course_number:       the course number (e.g. 498)
+        :param seats_available:     the open seats
+        :param wait_available:      the open waitlist spots
+        :param wait_count:          the students on the waitlist
+        :param wait_capacity:       the waitlist capacity
+        :param enrollment:          the enrolled students
+        :param maximum_enrollment:  the enrollment capacity
+        :param extra:               the other kept Banner fields, if any
+        :param loader:              the function decoding the full Banner section of a CRN, for the fields not kept
+        """
+
+        self.crn = crn
+        self.subject = subject
+        self.course_number = course_number
+        self.seats_available = seats_available
+        self.wait_available = wait_available
+        self.wait_count = wait_count
+        self.wait_capacity = wait_capacity
+        self.enrollment = enrollment
+        self.maximum_enrollment = maximum_enrollment
+        self._extra = extra
+        self._loader = loader
+
+    @classmethod
+    def from_dict(
+        cls,
+        candidate: Dict,
+        extra_fields: Optional[tuple[str, ...]] = None,
+        loader: Optional[Callable[[str], Optional[Dict]]] = None
+    ) -> "Section":
+        """
+        Build the record of a decoded Banner section
+
+        :param candidate:       the decoded Banner section
+        :param extra_fields:    the Banner fields kept besides the typed ones
+        :param loader:          the function decoding the full Banner section of a CRN, for the fields not kept
+        :return: the record
+        """
+
+        extra = None
+        if extra_fields:
+            extra = {field: candidate[field] for field in extra_fields if field in candidate and field not in cls.KEY_MAP}
+
+        return cls(
+            crn=candidate["courseReferenceNumber"],
+            subject=candidate.get("subject"),
+            course_number=candidate.get("courseNumber"),
+            seats_available=candidate.get("seatsAvailable"),
+            wait_available=candidate.get("waitAvailable"),
+            wait_count=candidate.get("waitCount"),
+            wait_capacity=candidate.get("waitCapacity"),
+            enrollment=candidate.get("enrollment"),
+            maximum_enrollment=candidate.get("maximumEnrollment"),
+            extra=extra or None,
+            loader=loader
+        )
+
+    @property
+    def seat_state(self) -> tuple:
+        """
+        the (seatsAvailable, waitAvailable, enrollment, maximumEnrollment) of the section, in the order SeatDiffer uses
+        """
+
+        return self.seats_available, self.wait_available, self.enrollment, self.maximum_enrollment
+
+    def _full(self) -> Dict:
+        full = self._loader(self.crn) if self._loader is not None else None
+        return full or {}
+
+    def __getitem__(self, key: str) -> Any:
+        attr = self.KEY_MAP.get(key)
+        if attr is not None:
+            return getattr(self, attr)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        return self._full()[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.KEY_MAP or (self._extra is not None and key in self._extra) or key in self._full()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_dict())
+
+    def __len__(self) -> int:
+        return len(self.to_dict())
+
+    def to_dict(self) -> Dict:
+        """
+        Materialize the full Banner section, falling back to the kept fields if it can not be decoded anymore
+
+        :return: the section as a dict
+        """
+
+        full = self._full()
+        if full:
+            return dict(full)
+
+        candidate = {key: getattr(self, attr) for key, attr in self.KEY_MAP.items()}
+        candidate.update(self._extra or {})
+        return candidate
+
+    def __repr__(self) -> str:
+        return f"Section({self.crn}, seats={self.seats_available}, wait={self.wait_available}, enrollment={self.enrollment}/{self.maximum_enrollment})"
@@ -0,0 +1,182 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable, Optional
+
+from logger import Logger
+
+
+class StandbySession:
+    __slots__ = ("session", "headers", "params", "acquired_at")
+
+    def __init__(self, session, headers: dict, params: dict, acquired_at: Optional[float] = None) -> None:
+        """
+        A pre-authenticated session with its own connection pool & uniqueSessionId, ready to take over the polling,
+        its cookies are cloned from the active session when it is warmed, so it does not outlive their sign-in
+
+        :param session:     the pooled http session
+        :param headers:     the headers of its searchResults requests
+        :param params:      the params of its searchResults requests (txt_term, uniqueSessionId)
+        :param acquired_at: the time.monotonic() at which its token was acquired
+        """
+
+        self.session = session
+        self.headers = headers
+        self.params = params
+        self.acquired_at = acquired_at if acquired_at is not None else time.monotonic()
+
+
+class StandbyPool:
+    def __init__(
+        self,
+        size: int,
+        warm: Callable[[Optional[StandbySession]], StandbySession],
+        executor: Executor,
+        logger: Logger,
+        max_age: Callable[[], Optional[float]] = lambda: None,
+        retry_after: float = 60
+    ) -> None:
+        """
+        Keep a few pre-authenticated sessions warm in the background, so a failed fetch rotates instead of refreshing
+
+        :param size:        the number of standby sessions kept warm
+        :param warm:        the function (re-)authenticating a standby, given the standby to reuse or None for a new one
+        :param executor:    the executor the warming runs on, i.e. the refresh thread
+        :param logger:      the logger reporting failed warm-ups
+        :param max_age:     the function giving the seconds after which a standby token is stale, None while unknown
+        :param retry_after: the seconds to wait before warming again after a failed warm-up
+        """
+
+        self.size = size
+        self.warm = warm
+        self.executor = executor
+        self.logger = logger
+        self.max_age = max_age
+        self.retry_after = retry_after
+
+        self._ready = deque()
+        self._warming = 0
+        self._retry_at = 0.0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ready)
+
+    def _submit(self, standby: Optional[StandbySession] = None) -> None:
+        """
+        warm a standby on the executor, the caller holds the lock
+
+        :param standby: the standby to re-authenticate, None for a new one
+        :return: None
+        """
+
+        self._warming += 1
+        self.executor.submit(self._warm, standby)
+
+    def _warm(self, standby: Optional[StandbySession]) -> None:
+        """
+        the warm-up job, running on the executor
+
+        :param standby: the standby to re-authenticate, None for a new one
+        :return: None
+        """
+
+        warmed = None
+        try:
+            if not self._closed:
+                warmed = self.warm(standby)
+        except Exception as e:
+            self.logger.error(role="standby", message=f"failed to warm a standby session due to {str(e)}")
+            self._retry_at = time.monotonic() + self.retry_after
+
+        with self._lock:
+            self._warming -= 1
+            if warmed is not None and not self._closed:
+                self._ready.append(warmed)
+                self.logger.debug(role="standby", message=f"{len(self._ready)}/{self.size} standby sessions ready")
+                return
+
+        for left in (warmed, standby):
+            if left is not None:
+                left.session.close()
+
+    def fill(self) -> None:
+        """
+        Warm as many new standbys as are missing, unless the last warm-up failed recently
+
+        :return: None
+        """
+
+        with self._lock:
+            if self._closed or time.monotonic() < self._retry_at:
+                return
+            for _ in range(self.size - len(self._ready) - self._warming):
+                self._submit()
+
+    def maintain(self) -> None:
+        """
+        Re-authenticate the ready standbys whose token is about to go stale, then fill the pool
+
+        :return: None
+        """
+
+        max_age = self.max_age()
+        if max_age is not None:
+            now = time.monotonic()
+            with self._lock:
+                stale = [standby for standby in self._ready if now - standby.acquired_at > max_age]
+                for standby in stale:
+                    self._ready.remove(standby)
+                    self._submit(standby)
+        self.fill()
+
+    def take(self) -> Optional[StandbySession]:
+        """
+        Take the freshest ready standby
+
+        :return: the standby, None if none is ready
+        """
+
+        with self._lock:
+            return self._ready.pop() if self._ready else None
+
+    def retire(self, standby: StandbySession) -> None:
+        """
+        Hand back a session that failed, it is re-authenticated off the hot path and rejoins the pool
+
+        :param standby: the failed session
+        :return: None
+        """
+
+        with self._lock:
+            if self._closed or len(self._ready) + self._warming >= self.size:
+                standby.session.close()
+                return
+            self._submit(standby)
+
+    def clear(self) -> None:
+        """
+        Drop the ready standbys, e.g. once one of them is found dead, the next fill warms new ones
+
+        :return: None
+        """
+
+        with self._lock:
+            ready, self._ready = list(self._ready), deque()
+        for standby in ready:
+            standby.session.close()
+
+    def close(self) -> None:
+        """
+        Drop the ready standbys, the warm-ups still queued are skipped
+
+        :return: None
+        """
+
+        with self._lock:
+            self._closed = True
+            ready, self._ready = list(self._ready), deque()
+        for standby in ready:
+            standby.session.close()
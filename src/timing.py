@@ -0,0 +1,97 @@
+import time
+import threading
+from collections import deque
+from typing import Iterator, List, Optional
+
+
+class Attempt:
+    __slots__ = ("name", "started_at", "elapsed", "status", "error")
+
+    def __init__(self, name: str, started_at: float, elapsed: float, status: Optional[int], error: Optional[str]) -> None:
+        """
+        The timing of one network attempt
+
+        :param name:        what was requested (e.g. 'searchResults', 'getTerms', 'refresh')
+        :param started_at:  the time.monotonic() at which the attempt started
+        :param elapsed:     the seconds until it answered or failed
+        :param status:      the status code of the response, None if there was none
+        :param error:       the name of the error the attempt failed with, None if it answered
+        """
+
+        self.name = name
+        self.started_at = started_at
+        self.elapsed = elapsed
+        self.status = status
+        self.error = error
+
+    def __repr__(self) -> str:
+        outcome = self.error if self.error is not None else self.status
+        return f"Attempt({self.name}, {self.elapsed * 1000:.0f}ms, {outcome})"
+
+
+class AttemptLog:
+    def __init__(self, size: int = 512) -> None:
+        """
+        Keep the timings of the last network attempts, thread-safe
+
+        :param size: the number of attempts kept
+        """
+
+        self._attempts = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, name: str, started_at: float, status: Optional[int] = None, error: Optional[BaseException] = None) -> Attempt:
+        """
+        Record an attempt that just finished
+
+        :param name:        what was requested
+        :param started_at:  the time.monotonic() at which the attempt started
+        :param status:      the status code of the response, None if there was none
+        :param error:       the error the attempt failed with, None if it answered
+        :return: the recorded attempt
+        """
+
+        attempt = Attempt(
+            name=name,
+            started_at=started_at,
+            elapsed=time.monotonic() - started_at,
+            status=status,
+            error=type(error).__name__ if error is not None else None
+        )
+        with self._lock:
+            self._attempts.append(attempt)
+        return attempt
+
+    def __iter__(self) -> Iterator[Attempt]:
+        with self._lock:
+            return iter(list(self._attempts))
+
+    def __len__(self) -> int:
+        return len(self._attempts)
+
+    def latencies(self, name: Optional[str] = None) -> List[float]:
+        """
+        The latencies of the attempts that answered
+
+        :param name: only the attempts of this name, None for all
+        :return: the latencies (in seconds), oldest first
+        """
+
+        return [
+            attempt.elapsed for attempt in self
+            if attempt.error is None and (name is None or attempt.name == name)
+        ]
+
+    def percentile(self, q: float, name: Optional[str] = None) -> Optional[float]:
+        """
+        The latency percentile of the attempts that answered
+
+        :param q:       the percentile, between 0 and 100
+        :param name:    only the attempts of this name, None for all
+        :return: the latency (in seconds), None if nothing answered yet
+        """
+
+        latencies = sorted(self.latencies(name))
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q / 100))]
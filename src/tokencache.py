@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import importlib
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from fileutil import write_private, try_lock_file, unlock_file
+
+
+class TokenCache(ABC):
+    def __init__(self) -> None:
+        """
+        Share the refreshed token (headers, params, session cookies) of a NetID between SnowCat instances,
+        with a lock so only one of them refreshes at a time
+        """
+
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _local_lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """
+        Get the cached token of a NetID
+
+        :param key:     the NetID
+        :param max_age: the seconds after which a cached token is ignored, None to take it regardless
+        :return: the token (id, stored_at, headers, params, cookies), None if there is no fresh one
+        """
+
+        token = self._read(key)
+        if token is None or max_age is not None and time.time() - token.get("stored_at", 0) > max_age:
+            return None
+        return token
+
+    def put(self, key: str, headers: Dict, params: Dict, cookies: list) -> Dict:
+        """
+        Cache the freshly refreshed token of a NetID
+
+        :param key:     the NetID
+        :param headers: the headers of the searchResults requests
+        :param params:  the params of the searchResults requests (txt_term, uniqueSessionId)
+        :param cookies: the session cookies, as dicts of name, value, domain and path
+        :return: the cached token
+        """
+
+        token = {
+            "id": uuid.uuid4().hex,
+            "stored_at": time.time(),
+            "headers": headers,
+            "params": params,
+            "cookies": cookies,
+        }
+        self._write(key, token)
+        return token
+
+    def acquire(self, key: str, timeout: Optional[float] = None) -> bool:
+        """
+        Take the refresh lock of a NetID, blocking while another instance refreshes it
+
+        :param key:     the NetID
+        :param timeout: the seconds to wait for the lock, None to wait for it
+        :return: False if the lock was not taken within the timeout
+        """
+
+        lock = self._local_lock(key)
+        if not lock.acquire(timeout=timeout if timeout is not None else -1):
+            return False
+        try:
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            if self._acquire(key, deadline):
+                return True
+        except BaseException:
+            lock.release()
+            raise
+        lock.release()
+        return False
+
+    def release(self, key: str) -> None:
+        """
+        Release the refresh lock of a NetID
+
+        :param key: the NetID
+        :return: None
+        """
+
+        try:
+            self._release(key)
+        finally:
+            self._local_lock(key).release()
+
+    @contextmanager
+    def lock(self, key: str, timeout: Optional[float] = None) -> Iterator[bool]:
+        """
+        Hold the refresh lock of a NetID for the duration of a with block
+
+        :param key:     the NetID
+        :param timeout: the seconds to wait for the lock, None to wait for it
+        :return: whether the lock is held
+        """
+
+        acquired = self.acquire(key, timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.release(key)
+
+    @abstractmethod
+    def _read(self, key: str) -> Optional[Dict]:
+        """
+        read the stored token of a NetID
+
+        :param key: the NetID
+        :return: the token, None if there is none
+        """
+
+    @abstractmethod
+    def _write(self, key: str, token: Dict) -> None:
+        """
+        store the token of a NetID, replacing the previous one as a whole
+
+        :param key:     the NetID
+        :param token:   the token
+        :return: None
+        """
+
+    @abstractmethod
+    def _acquire(self, key: str, deadline: Optional[float]) -> bool:
+        """
+        take the lock shared with the other processes, the in-process lock is already held
+
+        :param key:         the NetID
+        :param deadline:    the time.monotonic() to give up at, None to wait for it
+        :return: False if the lock was not taken before the deadline
+        """
+
+    @abstractmethod
+    def _release(self, key: str) -> None:
+        """
+        release the lock shared with the other processes taken by _acquire
+
+        :param key: the NetID
+        :return: None
+        """
+
+
+class FileTokenCache(TokenCache):
+    def __init__(self, path: os.PathLike | str = Path.cwd() / Path("../configs/.token_cache"), poll: float = 0.2) -> None:
+        """
+        Cache the tokens in a local directory, locked with file locks, so every process on the machine shares them
+
+        :param path:    the directory of the token and lock files, keep it private since the tokens log you in
+        :param poll:    the seconds between two tries of a lock held by another process
+        """
+
+        super().__init__()
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.poll = poll
+        self._lock_files = {}
+
+    def _file(self, key: str, suffix: str) -> Path:
+        # the NetID is hashed so it is a safe file name
+        return self.path / f"{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}{suffix}"
+
+    def _read(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._file(key, ".json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write(self, key: str, token: Dict) -> None:
+        # written aside and renamed over, so readers never see half a token
+        write_private(self._file(key, ".json"), json.dumps(token))
+
+    def _acquire(self, key: str, deadline: Optional[float]) -> bool:
+        f = open(self._file(key, ".lock"), "a+")
+        while not try_lock_file(f):
+            if deadline is not None and time.monotonic() >= deadline:
+                f.close()
+                return False
+            time.sleep(self.poll)
+        self._lock_files[key] = f
+        return True
+
+    def _release(self, key: str) -> None:
+        f = self._lock_files.pop(key)
+        try:
+            unlock_file(f)
+        finally:
+            f.close()
+
+
+class RedisTokenCache(TokenCache):
+    # drop the lock only if it still holds our owner id, checked and deleted atomically on the server
+    RELEASE_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "snowcat:token:", lease: float = 600, poll: float = 0.2) -> None:
+        """
+        Cache the tokens in redis, so watchers on every machine share them, redis is only imported here
+
+        :param url:     the url of the redis server
+        :param prefix:  the prefix of the redis keys
+        :param lease:   the seconds after which a refresh lock is dropped, in case its holder died
+        :param poll:    the seconds between two tries of a lock held by another instance
+        """
+
+        super().__init__()
+        self._redis = importlib.import_module("redis").Redis.from_url(url)
+        self._release_script = self._redis.register_script(self.RELEASE_SCRIPT)
+        self.prefix = prefix
+        self.lease = lease
+        self.poll = poll
+        self._owners = {}
+
+    def _key(self, key: str, suffix: str = "") -> str:
+        return f"{self.prefix}{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}{suffix}"
+
+    def _read(self, key: str) -> Optional[Dict]:
+        raw = self._redis.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    def _write(self, key: str, token: Dict) -> None:
+        self._redis.set(self._key(key), json.dumps(token))
+
+    def _acquire(self, key: str, deadline: Optional[float]) -> bool:
+        owner = uuid.uuid4().hex
+        while not self._redis.set(self._key(key, ":lock"), owner, nx=True, px=int(self.lease * 1000)):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll)
+        self._owners[key] = owner
+        return True
+
+    def _release(self, key: str) -> None:
+        # only drop the lock if it is still ours, the lease may have run out and another instance taken it meanwhile
+        owner = self._owners.pop(key)
+        self._release_script(keys=[self._key(key, ":lock")], args=[owner])
+
+
+def get_token_cache(name: str = 'file', **kwargs) -> TokenCache:
+    """
+    Build a token cache backend by name
+
+    :param name:    'file' (path=...) for a machine-wide cache, 'redis' (url=...) for a network-wide one
+    :param kwargs:  the arguments of the backend
+    :return: the token cache
+    """
+
+    backends = {
+        "file": FileTokenCache,
+        "redis": RedisTokenCache,
+    }
+    if name not in backends:
+        raise ValueError(f"unknown token cache: {name}")
+    return backends[name](**kwargs)
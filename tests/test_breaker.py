@@ -0,0 +1,79 @@
+import pytest
+
+import breaker
+from breaker import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_the_threshold_of_failures_in_a_row(clock):
+    circuit = CircuitBreaker(failure_threshold=3, jitter=0)
+
+    assert [circuit.record_failure() for _ in range(3)] == [False, False, True]
+    assert circuit.state == CircuitBreaker.OPEN
+    assert circuit.allow() is None
+
+
+def test_a_success_resets_the_count(clock):
+    circuit = CircuitBreaker(failure_threshold=3, jitter=0)
+
+    circuit.record_failure()
+    circuit.record_failure()
+    circuit.record_success()
+
+    assert not circuit.record_failure()
+    assert circuit.allow() is False
+
+
+def test_lets_a_single_probe_through_after_the_timeout(clock):
+    circuit = CircuitBreaker(failure_threshold=1, reset_timeout=60, jitter=0)
+    circuit.record_failure()
+
+    assert circuit.retry_in() == 60
+    clock[0] += 60
+    assert circuit.allow() is True
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+    assert circuit.allow() is None
+
+
+def test_a_successful_probe_closes_the_circuit(clock):
+    circuit = CircuitBreaker(failure_threshold=1, reset_timeout=60, jitter=0)
+    circuit.record_failure()
+    clock[0] += 60
+    circuit.allow()
+
+    circuit.record_success()
+
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert circuit.allow() is False
+
+
+def test_a_failed_probe_doubles_the_timeout_up_to_the_max(clock):
+    circuit = CircuitBreaker(failure_threshold=1, reset_timeout=60, max_reset_timeout=200, jitter=0)
+    circuit.record_failure()
+
+    timeouts = []
+    for _ in range(3):
+        clock[0] += circuit.retry_in()
+        assert circuit.allow() is True
+        assert circuit.record_failure()
+        timeouts.append(circuit.retry_in())
+
+    assert timeouts == [120, 200, 200]
+
+
+def test_jitter_only_shortens_the_timeout(clock):
+    circuit = CircuitBreaker(failure_threshold=1, reset_timeout=60, jitter=0.2)
+    circuit.record_failure()
+
+    assert 48 <= circuit.retry_in() <= 60
+
+
+def test_shared_breakers_are_per_upstream():
+    assert CircuitBreaker.shared("test-a") is CircuitBreaker.shared("test-a")
+    assert CircuitBreaker.shared("test-a") is not CircuitBreaker.shared("test-b")
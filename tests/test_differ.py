@@ -0,0 +1,74 @@
+from differ import SeatDiffer, SeatEvent
+
+
+def section(crn, seats, wait=0, enrollment=0, maximum=30):
+    return {
+        "courseReferenceNumber": crn,
+        "seatsAvailable": seats,
+        "waitAvailable": wait,
+        "enrollment": enrollment,
+        "maximumEnrollment": maximum,
+    }
+
+
+def kinds(events):
+    return [(event.kind, event.crn) for event in events]
+
+
+def test_first_poll_only_reports_the_open_sections():
+    differ = SeatDiffer()
+
+    events = differ.update([section("1", 0), section("2", 3)])
+
+    assert kinds(events) == [(SeatEvent.OPENED, "2")]
+    assert events[0].before is None
+
+
+def test_opening_and_closing():
+    differ = SeatDiffer()
+    differ.update([section("1", 0, enrollment=30), section("2", 1, enrollment=29)])
+
+    events = differ.update([section("1", 1, enrollment=29), section("2", 0, enrollment=30)])
+
+    assert kinds(events) == [
+        (SeatEvent.OPENED, "1"), (SeatEvent.ENROLLMENT_CHANGED, "1"),
+        (SeatEvent.CLOSED, "2"), (SeatEvent.ENROLLMENT_CHANGED, "2"),
+    ]
+    assert events[0].before == (0, 0, 30, 30) and events[0].after == (1, 0, 29, 30)
+
+
+def test_unchanged_sections_emit_nothing():
+    differ = SeatDiffer()
+    differ.update([section("1", 2)])
+
+    assert differ.update([section("1", 2)]) == []
+
+
+def test_more_seats_in_an_open_section_is_no_opening():
+    differ = SeatDiffer()
+    differ.update([section("1", 2, enrollment=28)])
+
+    assert kinds(differ.update([section("1", 3, enrollment=27)])) == [(SeatEvent.ENROLLMENT_CHANGED, "1")]
+
+
+def test_waitlist_changes():
+    differ = SeatDiffer()
+    differ.update([section("1", 0, wait=0)])
+
+    assert kinds(differ.update([section("1", 0, wait=2)])) == [(SeatEvent.WAITLIST_CHANGED, "1")]
+
+
+def test_missing_seats_count_as_closed():
+    differ = SeatDiffer()
+    differ.update([section("1", None)])
+
+    assert kinds(differ.update([section("1", 1)])) == [(SeatEvent.OPENED, "1")]
+
+
+def test_reset_reports_the_open_sections_again():
+    differ = SeatDiffer()
+    differ.update([section("1", 2)])
+
+    differ.reset()
+
+    assert kinds(differ.update([section("1", 2)])) == [(SeatEvent.OPENED, "1")]
@@ -0,0 +1,95 @@
+import threading
+import time
+
+from dispatcher import TriggerDispatcher
+from logger import Logger
+
+
+def test_a_hung_trigger_only_holds_back_its_own_key():
+    dispatcher = TriggerDispatcher(Logger(), max_workers=4, timeout=30)
+    hang = threading.Event()
+    ran_b = threading.Event()
+    ran = []
+
+    dispatcher.submit(hang.wait, key="A")
+    for i in range(4):
+        dispatcher.submit(ran.append, ("A", i), key="A")
+    dispatcher.submit(lambda: (ran.append("B"), ran_b.set()), key="B")
+
+    assert ran_b.wait(2)
+    assert ran == ["B"]
+
+    hang.set()
+    dispatcher.shutdown(wait=True)
+    assert ran == ["B", ("A", 0), ("A", 1), ("A", 2), ("A", 3)]
+
+
+def test_triggers_of_a_key_run_in_order():
+    dispatcher = TriggerDispatcher(Logger(), max_workers=4)
+    ran = []
+
+    def slow(i):
+        time.sleep(0.01)
+        ran.append(i)
+
+    for i in range(10):
+        dispatcher.submit(slow, i, key="A")
+    dispatcher.shutdown(wait=True)
+
+    assert ran == list(range(10))
+
+
+def test_over_the_bound_a_key_keeps_its_latest_trigger():
+    dispatcher = TriggerDispatcher(Logger(), max_workers=1, max_pending=3)
+    release = threading.Event()
+    ran = []
+
+    dispatcher.submit(release.wait, key="A")
+    results = [dispatcher.submit(ran.append, i, key="A") for i in range(5)]
+    release.set()
+    dispatcher.shutdown(wait=True)
+
+    assert all(results)
+    assert ran == [4]
+
+
+def test_over_the_bound_unkeyed_triggers_are_dropped():
+    dispatcher = TriggerDispatcher(Logger(), max_workers=1, max_pending=1)
+    release = threading.Event()
+    ran = []
+
+    assert dispatcher.submit(release.wait)
+    assert not dispatcher.submit(ran.append, 1)
+    release.set()
+    dispatcher.shutdown(wait=True)
+
+    assert ran == []
+
+
+def test_a_failing_trigger_does_not_stop_the_chain():
+    dispatcher = TriggerDispatcher(Logger(), max_workers=2)
+    ran = []
+
+    def boom():
+        raise RuntimeError("boom")
+
+    dispatcher.submit(boom, key="A")
+    dispatcher.submit(ran.append, 1, key="A")
+    dispatcher.shutdown(wait=True)
+
+    assert ran == [1]
+
+
+def test_shutdown_without_waiting_skips_the_waiting_triggers():
+    dispatcher = TriggerDispatcher(Logger(), max_workers=1)
+    release = threading.Event()
+    ran = []
+
+    dispatcher.submit(release.wait, key="A")
+    dispatcher.submit(ran.append, 1, key="A")
+    dispatcher.shutdown(wait=False)
+    release.set()
+
+    assert not dispatcher.submit(ran.append, 2, key="B")
+    time.sleep(0.05)
+    assert ran == []
@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from base import BaseSnowCat
+from errors import AuthError, DecodeError, ServerError, ThrottledError
+
+
+class Cat(BaseSnowCat):
+    def _export_cookies(self) -> list:
+        return []
+
+    def _import_cookies(self, cookies: list) -> None:
+        pass
+
+
+@pytest.fixture
+def cat(tmp_path):
+    return Cat(config_path=tmp_path / ".env", notifier=None, json_backend="json")
+
+
+def payload(*crns, total=None):
+    data = [{"courseReferenceNumber": crn, "seatsAvailable": 0, "courseTitle": "Title"} for crn in crns]
+    return json.dumps({"success": True, "totalCount": len(data) if total is None else total, "data": data}).encode()
+
+
+KEY = (("txt_subject", "CS"),)
+
+
+def test_a_new_body_is_decoded_and_cached(cat):
+    response, changed = cat._resolve_poll(KEY, 200, {"ETag": '"v1"'}, payload("1"))
+
+    assert changed and response["data"][0]["courseReferenceNumber"] == "1"
+    assert cat._conditional_headers(KEY, {"h": "1"}) == {"h": "1", "If-None-Match": '"v1"'}
+
+
+def test_not_modified_reuses_the_last_body(cat):
+    first, _ = cat._resolve_poll(KEY, 200, {"ETag": '"v1"'}, payload("1"))
+
+    response, changed = cat._resolve_poll(KEY, 304, {}, b"")
+
+    assert not changed and response is first
+
+
+def test_an_identical_body_is_not_decoded_again(cat, monkeypatch):
+    first, _ = cat._resolve_poll(KEY, 200, {}, payload("1"))
+    monkeypatch.setattr(cat, "_decode", lambda content: pytest.fail("decoded again"))
+
+    response, changed = cat._resolve_poll(KEY, 200, {}, payload("1"))
+
+    assert not changed and response is first
+
+
+def test_a_different_body_is_a_change(cat):
+    cat._resolve_poll(KEY, 200, {}, payload("1"))
+
+    response, changed = cat._resolve_poll(KEY, 200, {}, payload("1", "2"))
+
+    assert changed and len(response["data"]) == 2
+
+
+def test_the_login_page_is_an_expired_session(cat):
+    with pytest.raises(AuthError):
+        cat._resolve_poll(KEY, 200, {}, b"  <!DOCTYPE html><html>login</html>")
+
+
+def test_a_garbled_body_is_a_decode_error(cat):
+    with pytest.raises(DecodeError):
+        cat._resolve_poll(KEY, 200, {}, b'{"data": [')
+
+
+@pytest.mark.parametrize("status_code, error", [(302, AuthError), (401, AuthError), (429, ThrottledError), (503, ServerError)])
+def test_failed_statuses_raise(cat, status_code, error):
+    with pytest.raises(error):
+        cat._resolve_poll(KEY, status_code, {}, b"")
+
+
+def test_a_304_without_a_cached_body_is_a_decode_error(cat):
+    with pytest.raises(DecodeError):
+        cat._resolve_poll(KEY, 304, {}, b"")
+
+
+def test_a_narrow_query_is_used_when_banner_honours_it(cat):
+    assert cat._narrow_crn(["12345"]) == "12345"
+
+    assert cat._check_narrow(json.loads(payload("12345")), "12345")
+    assert cat._crn_query_supported is True
+
+
+def test_an_ignored_narrow_query_falls_back_for_good(cat):
+    assert not cat._check_narrow(json.loads(payload("12345", "67890")), "12345")
+
+    assert cat._crn_query_supported is False
+    assert cat._narrow_crn("12345") is None
+
+
+def test_an_empty_narrow_result_decides_nothing(cat):
+    assert cat._check_narrow(json.loads(payload()), "12345")
+    assert cat._crn_query_supported is None
+
+
+def test_only_a_single_crn_is_narrowed(cat):
+    assert cat._narrow_crn(None) is None
+    assert cat._narrow_crn([1, 2]) is None
+    assert cat._narrow_crn({12345}) == "12345"
+
+
+@pytest.mark.parametrize("response, offset", [
+    ({"totalCount": 3, "data": [{}]}, 1),
+    ({"totalCount": 1, "data": [{}]}, None),
+    ({"totalCount": None, "data": [{}]}, None),
+    ({"data": None}, None),
+    (None, None),
+])
+def test_next_page_offset(response, offset):
+    assert BaseSnowCat._next_page_offset(response) == offset
+
+
+def test_the_projection_always_keeps_the_crn(tmp_path):
+    cat = Cat(config_path=tmp_path / ".env", notifier=None, json_backend="json", fields=("seatsAvailable",))
+
+    response, _ = cat._resolve_poll(KEY, 200, {}, payload("12345"))
+
+    assert response["data"] == [{"courseReferenceNumber": "12345", "seatsAvailable": 0}]
+    assert [candidate["courseReferenceNumber"] for candidate in cat._parse_candidates(response, "12345")] == ["12345"]
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+
+import pytest
+
+import ratelimit
+from ratelimit import TokenBucket, FileTokenBucket, RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    monkeypatch.setattr(ratelimit.time, "time", clock)
+    return clock
+
+
+def test_bucket_allows_the_burst_then_asks_to_wait(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_bucket_refills_at_rate_up_to_burst(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    for _ in range(3):
+        bucket.reserve()
+
+    clock.now += 1
+    assert [bucket.reserve() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.reserve() > 0
+
+    clock.now += 100
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() > 0
+
+
+def test_bucket_wait_covers_the_missing_tokens(clock):
+    bucket = TokenBucket(rate=4, burst=1)
+    bucket.reserve()
+
+    clock.now += 0.125
+    assert bucket.reserve() == pytest.approx(0.125)
+
+
+def test_file_buckets_share_one_budget(clock, tmp_path):
+    path = tmp_path / "banner.bucket"
+    first = FileTokenBucket(path, rate=1, burst=2)
+    second = FileTokenBucket(path, rate=1, burst=2)
+
+    assert first.reserve() == 0.0
+    assert second.reserve() == 0.0
+    assert first.reserve() > 0
+    assert second.reserve() > 0
+
+
+@pytest.mark.parametrize("content", ['{"tokens": 0.0, "upd', "[1, 2]", "\x00\x00"])
+def test_file_bucket_recovers_from_a_torn_state_file(clock, tmp_path, content):
+    path = tmp_path / "banner.bucket"
+    path.write_text(content)
+    bucket = FileTokenBucket(path, rate=1, burst=2)
+
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() > 0
+
+
+def test_limiter_keeps_one_bucket_per_host():
+    limiter = RateLimiter(rate=1, burst=1, limits={"fast.example": (100, 50)})
+
+    assert limiter.bucket("https://a.example/x") is limiter.bucket("https://a.example/y")
+    assert limiter.bucket("https://a.example/x") is not limiter.bucket("https://b.example/x")
+    assert limiter.bucket("https://fast.example/x").burst == 50
+
+
+def test_shared_limiter_is_per_configuration():
+    assert RateLimiter.shared(rate=3, burst=4) is RateLimiter.shared(rate=3, burst=4)
+    assert RateLimiter.shared(rate=3, burst=4) is not RateLimiter.shared(rate=3, burst=5)
+
+
+def test_acquire_async_reserves_a_file_bucket_off_the_event_loop(tmp_path):
+    limiter = RateLimiter(rate=100, burst=1, coordinator_dir=tmp_path)
+    bucket = limiter.bucket("https://a.example/x")
+    threads = []
+    reserve = bucket.reserve
+
+    def spy():
+        threads.append(threading.current_thread())
+        return reserve()
+
+    bucket.reserve = spy
+    asyncio.run(limiter.acquire_async("https://a.example/x"))
+
+    assert threads and threading.main_thread() not in threads
+
+
+def test_try_acquire_never_waits(clock):
+    limiter = RateLimiter(rate=1, burst=1)
+
+    assert limiter.try_acquire("https://a.example/x")
+    assert not limiter.try_acquire("https://a.example/x")
+    clock.now += 1
+    assert limiter.try_acquire("https://a.example/x")
+
+
+def test_a_prepaid_token_covers_only_the_next_request():
+    assert not RateLimiter.take_prepaid()
+    with RateLimiter.prepaid():
+        assert RateLimiter.take_prepaid()
+        assert not RateLimiter.take_prepaid()
+    assert not RateLimiter.take_prepaid()
+
+
+def test_a_prepaid_token_stays_in_its_thread():
+    seen = []
+    with RateLimiter.prepaid():
+        thread = threading.Thread(target=lambda: seen.append(RateLimiter.take_prepaid()))
+        thread.start()
+        thread.join()
+        assert RateLimiter.take_prepaid()
+
+    assert seen == [False]
@@ -0,0 +1,80 @@
+import pytest
+
+from errors import AuthError, NetworkError, ThrottledError, ServerError
+from retry import RetryPolicy
+
+
+def test_backoff_doubles_per_failure_of_a_class_up_to_its_cap():
+    policy = RetryPolicy(jitter=0)
+
+    delays = [policy.failure(NetworkError("down")).delay for _ in range(8)]
+
+    assert delays == [1, 2, 4, 8, 16, 32, 60, 60]
+
+
+def test_every_class_keeps_its_own_streak():
+    policy = RetryPolicy(jitter=0)
+
+    policy.failure(NetworkError("down"))
+    policy.failure(NetworkError("down"))
+    decision = policy.failure(ServerError("500"))
+
+    assert (decision.kind, decision.attempt, decision.delay) == ("server", 1, 5)
+    assert policy.failures == 3
+
+
+def test_only_auth_failures_refresh_and_the_first_one_right_away():
+    policy = RetryPolicy(jitter=0)
+
+    first = policy.failure(AuthError("expired"))
+    second = policy.failure(AuthError("expired"))
+
+    assert first.refresh and first.delay == 0
+    assert second.refresh and second.delay == 1
+    assert not policy.failure(NetworkError("down")).refresh
+
+
+def test_retry_after_is_a_floor():
+    policy = RetryPolicy(jitter=0)
+
+    assert policy.failure(ThrottledError("429", retry_after=120)).delay == 120
+    assert policy.failure(ThrottledError("429", retry_after=1)).delay == 20
+
+
+def test_unknown_errors_back_off_as_unknown():
+    decision = RetryPolicy(jitter=0).failure(KeyError("x"))
+
+    assert (decision.kind, decision.delay) == ("unknown", 5)
+
+
+def test_jitter_only_shortens_the_delay():
+    policy = RetryPolicy(jitter=0.5)
+
+    for attempt in range(1, 6):
+        delay = policy.failure(ServerError("500")).delay
+        assert 5 * 2 ** (attempt - 1) * 0.5 <= delay <= 5 * 2 ** (attempt - 1)
+
+
+def test_alerts_on_the_first_failure_then_every_doubling():
+    policy = RetryPolicy()
+
+    alerts = [n for n in range(1, 17) if policy.failure(NetworkError("down")).alert]
+
+    assert alerts == [1, 2, 4, 8, 16]
+
+
+@pytest.mark.parametrize("give_up_after, expected", [(None, [False] * 4), (3, [False, False, True, True])])
+def test_give_up_after(give_up_after, expected):
+    policy = RetryPolicy(give_up_after=give_up_after)
+
+    assert [policy.failure(NetworkError("down")).give_up for _ in range(4)] == expected
+
+
+def test_success_resets_the_streaks():
+    policy = RetryPolicy(jitter=0)
+    policy.failure(NetworkError("down"))
+    policy.failure(NetworkError("down"))
+
+    assert policy.success() == 2
+    assert policy.healthy
+    assert policy.failure(NetworkError("down")).delay == 1
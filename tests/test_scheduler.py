@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from scheduler import AdaptiveScheduler
+
+
+def test_churn_tightens_and_quiet_relaxes_within_the_bounds():
+    scheduler = AdaptiveScheduler(interval=10, min_interval=2, max_interval=20)
+    scheduler.add("a")
+
+    assert scheduler.record("a", churned=True) == 5
+    assert scheduler.record("a", churned=True) == 2.5
+    assert scheduler.record("a", churned=True) == 2
+    assert scheduler.record("a", churned=False) == 2.5
+
+    for _ in range(10):
+        delay = scheduler.record("a", churned=False)
+    assert delay == 20
+
+
+def test_bounds_default_to_a_fixed_interval():
+    scheduler = AdaptiveScheduler(interval=15)
+    scheduler.add("a")
+
+    assert scheduler.record("a", churned=True) == 15
+    assert scheduler.record("a", churned=False) == 15
+
+
+def test_min_interval_above_max_interval_is_rejected():
+    with pytest.raises(ValueError):
+        AdaptiveScheduler(interval=10, min_interval=20, max_interval=5)
+
+
+def test_budget_stretches_every_interval():
+    scheduler = AdaptiveScheduler(interval=10, budget=6)
+    for key in ("a", "b", "c"):
+        scheduler.add(key)
+
+    # 3 courses every 10s are 18 requests a minute, 3 times the budget
+    assert scheduler.record("a", churned=False) == pytest.approx(30)
+
+
+def test_polls_at_min_interval_close_to_a_deadline():
+    deadline = datetime.now() + timedelta(minutes=10)
+    scheduler = AdaptiveScheduler(interval=10, min_interval=1, max_interval=60, deadlines=[deadline])
+    scheduler.add("a")
+
+    assert scheduler.record("a", churned=False) == 1
+
+
+def test_a_past_deadline_does_not_tighten():
+    deadline = datetime.now() - timedelta(minutes=10)
+    scheduler = AdaptiveScheduler(interval=10, min_interval=1, max_interval=60, deadlines=[deadline])
+    scheduler.add("a")
+
+    assert scheduler.record("a", churned=False) == 12.5
+
+
+def test_next_due_pops_the_earliest_course():
+    scheduler = AdaptiveScheduler(interval=10)
+    scheduler.add("a")
+    scheduler.add("b")
+    scheduler.next_due()
+    scheduler.next_due()
+
+    scheduler.schedule("a", 30)
+    scheduler.schedule("b", 5)
+
+    key, wait = scheduler.next_due()
+    assert key == "b" and 0 < wait <= 5
+    assert scheduler.next_due()[0] == "a"
+
+
+def test_added_courses_are_due_right_away_in_order():
+    scheduler = AdaptiveScheduler(interval=10)
+    scheduler.add("a")
+    scheduler.add("b")
+
+    assert scheduler.next_due() == ("a", 0.0)
+    assert scheduler.next_due() == ("b", 0.0)
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from section import Section
+
+
+BANNER = {
+    "courseReferenceNumber": "12345",
+    "subject": "CS",
+    "courseNumber": "498",
+    "seatsAvailable": 2,
+    "waitAvailable": 0,
+    "waitCount": 0,
+    "waitCapacity": 10,
+    "enrollment": 28,
+    "maximumEnrollment": 30,
+    "courseTitle": "Special Topics",
+    "faculty": [{"displayName": "Someone"}],
+}
+
+
+def test_reads_like_the_banner_dict():
+    section = Section.from_dict(BANNER, extra_fields=("courseTitle",))
+
+    assert section["seatsAvailable"] == 2 and section.seats_available == 2
+    assert section.get("courseTitle") == "Special Topics"
+    assert section.get("faculty", "missing") == "missing"
+    assert section.seat_state == (2, 0, 28, 30)
+
+
+def test_iterates_and_counts_the_kept_fields_without_a_loader():
+    section = Section.from_dict(BANNER, extra_fields=("courseTitle",))
+
+    assert sorted(section) == sorted(set(Section.KEY_MAP) | {"courseTitle"})
+    assert len(section) == len(list(section)) == len(Section.KEY_MAP) + 1
+    assert section == section.to_dict()
+    assert json.loads(json.dumps(section.to_dict()))["courseTitle"] == "Special Topics"
+
+
+def test_the_fields_not_kept_come_from_the_loader():
+    loads = []
+
+    def loader(crn):
+        loads.append(crn)
+        return BANNER
+
+    section = Section.from_dict(BANNER, loader=loader)
+
+    assert section["faculty"] == BANNER["faculty"]
+    assert "courseTitle" in section
+    assert list(section) == list(BANNER) and len(section) == len(BANNER)
+    assert section.to_dict() == BANNER and section == BANNER
+    assert set(loads) == {"12345"}
+
+
+def test_a_section_the_loader_lost_falls_back_to_the_kept_fields():
+    section = Section.from_dict(BANNER, loader=lambda crn: None)
+
+    with pytest.raises(KeyError):
+        section["faculty"]
+    assert section.to_dict()["seatsAvailable"] == 2
+
+
+def test_the_full_payload_is_decoded_once_per_poll(tmp_path):
+    pytest.importorskip("dotenv")
+    from base import BaseSnowCat
+
+    class Cat(BaseSnowCat):
+        def _export_cookies(self) -> list:
+            return []
+
+        def _import_cookies(self, cookies: list) -> None:
+            pass
+
+    cat = Cat(config_path=tmp_path / ".env", notifier=None, json_backend="json", records=True)
+    decodes = []
+
+    def decode(content):
+        decodes.append(content)
+        return json.loads(content)
+
+    cat._decode = decode
+    data = [dict(BANNER, courseReferenceNumber=str(crn)) for crn in range(20)]
+    content = json.dumps({"success": True, "totalCount": 20, "data": data}).encode()
+    response, _ = cat._resolve_poll((("txt_subject", "CS"),), 200, {}, content)
+
+    for section in response["data"]:
+        assert section["faculty"] == BANNER["faculty"]
+        assert len(section) == len(BANNER)
+
+    # one decode for the poll itself, one for every full section read from it
+    assert len(decodes) == 2
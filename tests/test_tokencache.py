@@ -0,0 +1,50 @@
+import os
+import stat
+import time
+
+import pytest
+
+from tokencache import TokenCache, FileTokenCache
+
+
+def test_token_cache_backends_implement_the_storage():
+    with pytest.raises(TypeError):
+        TokenCache()
+
+
+def test_a_put_token_is_shared_between_instances(tmp_path):
+    FileTokenCache(tmp_path).put("netid", {"h": "1"}, {"uniqueSessionId": "u"}, [])
+
+    token = FileTokenCache(tmp_path).get("netid")
+
+    assert token["headers"] == {"h": "1"} and token["params"] == {"uniqueSessionId": "u"}
+    assert FileTokenCache(tmp_path).get("other") is None
+
+
+def test_a_stale_token_is_ignored(tmp_path):
+    cache = FileTokenCache(tmp_path)
+    token = cache.put("netid", {}, {}, [])
+    token["stored_at"] = time.time() - 100
+    cache._write("netid", token)
+
+    assert cache.get("netid", max_age=60) is None
+    assert cache.get("netid", max_age=200) is not None
+    assert cache.get("netid") is not None
+
+
+def test_the_token_file_is_private(tmp_path):
+    FileTokenCache(tmp_path).put("netid", {}, {}, [])
+
+    (path,) = tmp_path.glob("*.json")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_only_one_instance_holds_the_refresh_lock(tmp_path):
+    first, second = FileTokenCache(tmp_path, poll=0.01), FileTokenCache(tmp_path, poll=0.01)
+
+    with first.lock("netid") as held:
+        assert held
+        assert not second.acquire("netid", timeout=0.05)
+
+    assert second.acquire("netid", timeout=0.05)
+    second.release("netid")
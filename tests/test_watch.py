@@ -0,0 +1,95 @@
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("playwright")
+
+from SnowCat import SnowCat
+from dispatcher import TriggerDispatcher
+from errors import NetworkError
+from retry import RetryPolicy
+from scheduler import AdaptiveScheduler
+
+
+class Stop(BaseException):
+    pass
+
+
+class Cat(SnowCat):
+    def __init__(self, failing: set, polls: int, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.failing = failing
+        self.polls = polls
+        self.fetched = []
+
+    def fetch(self, course_abb, course_num, course_ids=None):
+        self.fetched.append(course_abb)
+        if course_abb in self.failing:
+            raise NetworkError("connection reset")
+        if self.fetched.count(course_abb) >= self.polls:
+            raise Stop()
+        return []
+
+
+def run(cat, retry_policy=RetryPolicy):
+    specs = [
+        {"course_field": field, "course_abb": field, "course_num": 100, "course_ids": None, "on_trigger": lambda *args: None}
+        for field in ("A", "B")
+    ]
+    scheduler = AdaptiveScheduler(interval=0.01)
+    for index in range(len(specs)):
+        scheduler.add(index)
+    dispatcher = TriggerDispatcher(logger=cat.logger)
+    try:
+        cat._watch_loop(specs, scheduler, dispatcher, timeout=1000, retry_policy=retry_policy)
+    finally:
+        dispatcher.shutdown(wait=True)
+
+
+@pytest.fixture
+def make_cat(tmp_path):
+    def make(failing, polls=3):
+        return Cat(failing, polls, config_path=tmp_path / ".env", notifier=None, json_backend="json")
+    return make
+
+
+def test_a_failing_course_backs_off_without_starving_the_others(make_cat):
+    cat = make_cat({"A"})
+
+    with pytest.raises(Stop):
+        run(cat)
+
+    # A backs off for about a second on the schedule, B is polled meanwhile
+    assert cat.fetched.count("A") == 1
+    assert cat.fetched.count("B") == 3
+
+
+def test_every_course_has_its_own_policy(make_cat):
+    policies = []
+
+    def factory():
+        policies.append(RetryPolicy())
+        return policies[-1]
+
+    with pytest.raises(Stop):
+        run(make_cat({"A"}), factory)
+
+    assert len(policies) == 2
+    assert [policy.failures for policy in policies] == [1, 0]
+
+
+def test_a_course_giving_up_leaves_the_others_watched(make_cat):
+    cat = make_cat({"A"})
+
+    with pytest.raises(Stop):
+        run(cat, lambda: RetryPolicy(give_up_after=1))
+
+    assert cat.fetched.count("A") == 1
+    assert cat.fetched.count("B") == 3
+
+
+def test_the_watcher_exits_once_every_course_gave_up(make_cat):
+    cat = make_cat({"A", "B"})
+
+    run(cat, lambda: RetryPolicy(backoff={"network": (0.01, 0.01)}, give_up_after=2))
+
+    assert sorted(cat.fetched) == ["A", "A", "B", "B"]